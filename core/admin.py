@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
-from core import models
+from core import models, sharding
 # Register your models here.
 
 
@@ -23,7 +23,30 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class ShardedDataAdmin(admin.ModelAdmin):
+    """Admin of recipe data, hidden while sharding is on
+
+    Outside a request for a user no shard is active, so the pages would only query the
+    default database and show nothing; inspect the shards with dbshell or the API instead.
+    """
+
+    def has_module_permission(self, request):
+        return not sharding.is_enabled() and super().has_module_permission(request)
+
+    def has_view_permission(self, request, obj=None):
+        return not sharding.is_enabled() and super().has_view_permission(request, obj)
+
+    def has_add_permission(self, request):
+        return not sharding.is_enabled() and super().has_add_permission(request)
+
+    def has_change_permission(self, request, obj=None):
+        return not sharding.is_enabled() and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not sharding.is_enabled() and super().has_delete_permission(request, obj)
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
\ No newline at end of file
+admin.site.register(models.Tag, ShardedDataAdmin)
+admin.site.register(models.Ingredient, ShardedDataAdmin)
+admin.site.register(models.Recipe, ShardedDataAdmin)
@@ -0,0 +1,178 @@
+"""Helpers shared by the benchmark management commands"""
+import asyncio
+import contextlib
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.test import Client, override_settings
+
+from core.models import Tag, Ingredient, Recipe
+from recipes import search, stats
+
+
+@contextlib.contextmanager
+def scratch_database(using='default'):
+    """Run the block against a throwaway copy of the schema, like the test runner does"""
+    connection = connections[using]
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed(users, tags=30, ingredients=30, recipes=40, fanout=3, batch_size=5000, start=0, prefix='bench', stdout=None):
+    """Create users with tags, ingredients and recipes linked with the given M2M fan-out
+
+    Users get the emails <prefix><number>@example.com, so give each run a prefix of its own when
+    seeding a database that outlives it.
+    """
+    User = get_user_model()
+    started = time.perf_counter()
+    user_ids = []
+
+    for first in range(0, users, batch_size):
+        batch = [
+            User(email=f'{prefix}{i}@example.com', name=f'Bench {i}', password='!')
+            for i in range(start + first, start + min(first + batch_size, users))
+        ]
+        user_ids.extend(user.id for user in User.objects.bulk_create(batch, batch_size=batch_size))
+
+    total = 0
+    recipe_ids = []
+    for user_id in user_ids:
+        tag_objs = Tag.objects.bulk_create(
+            [Tag(user_id=user_id, name=f'Tag {i}') for i in range(tags)], batch_size=batch_size
+        )
+        ingredient_objs = Ingredient.objects.bulk_create(
+            [Ingredient(user_id=user_id, name=f'Ingredient {i}') for i in range(ingredients)], batch_size=batch_size
+        )
+        recipe_objs = Recipe.objects.bulk_create([
+            Recipe(user_id=user_id, title=f'Recipe {i}', time_minutes=random.randint(5, 120),
+                   price=random.randint(100, 5000) / 100)
+            for i in range(recipes)
+        ], batch_size=batch_size)
+
+        tag_links = []
+        ingredient_links = []
+        for recipe in recipe_objs:
+            for tag in random.sample(tag_objs, min(fanout, len(tag_objs))):
+                tag_links.append(Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id))
+            for ingredient in random.sample(ingredient_objs, min(fanout, len(ingredient_objs))):
+                ingredient_links.append(Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredient.id))
+        Recipe.tags.through.objects.bulk_create(tag_links, batch_size=batch_size)
+        Recipe.ingredients.through.objects.bulk_create(ingredient_links, batch_size=batch_size)
+        recipe_ids.extend(recipe.id for recipe in recipe_objs)
+
+        total += len(tag_objs) + len(ingredient_objs) + len(recipe_objs) + len(tag_links) + len(ingredient_links)
+
+    # bulk_create skipped the signals maintaining the summary tables and the search index
+    stats.repair(Recipe.objects.db, user_ids=user_ids)
+    search.index_recipes(recipe_ids, using=Recipe.objects.db, replace=False)
+
+    if stdout is not None:
+        elapsed = time.perf_counter() - started
+        stdout.write(f'Seeded {users} users and {total} rows in {elapsed:.1f}s')
+    return user_ids
+
+
+def measure(func, iterations):
+    """Call func repeatedly and return the duration of each call in milliseconds"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def measure_threaded(func, requests, concurrency):
+    """Spread the calls over a thread pool, returning per-call milliseconds and the wall time"""
+    def timed(_):
+        started = time.perf_counter()
+        try:
+            func()
+        finally:
+            close_old_connections()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(requests)))
+    return samples, time.perf_counter() - started
+
+
+def measure_async(func, requests, concurrency):
+    """Await func with at most concurrency calls in flight, returning per-call milliseconds and the wall time"""
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                started = time.perf_counter()
+                await func()
+                return (time.perf_counter() - started) * 1000
+
+        return await asyncio.gather(*(timed() for _ in range(requests)))
+
+    started = time.perf_counter()
+    samples = asyncio.run(run())
+    return list(samples), time.perf_counter() - started
+
+
+def allow_test_clients():
+    """Settings override letting the test clients' Host: testserver through, as the test runner does"""
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+
+
+class InProcessClient:
+    """Send requests through the Django handler without a server, like the test client"""
+
+    def __init__(self):
+        self.client = Client()
+        self.hosts = allow_test_clients()
+
+    def __enter__(self):
+        self.hosts.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.hosts.disable()
+
+    def request(self, method, path, data=None, headers=None):
+        body = json.dumps(data) if data is not None else ''
+        response = self.client.generic(method, path, body, content_type='application/json', headers=headers)
+        # Drain streaming responses so their generation is part of the measurement
+        content = b''.join(response) if response.streaming else response.content
+        return response.status_code, content
+
+
+class HTTPClient:
+    """Send requests to a running server, e.g. python manage.py runserver or an ASGI server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def request(self, method, path, data=None, headers=None):
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                         headers={'Content-Type': 'application/json', **(headers or {})})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
@@ -0,0 +1,270 @@
+import contextlib
+import datetime
+import itertools
+import json
+import random
+import secrets
+import subprocess
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import bench, profiling
+from core.models import Tag, Ingredient, Recipe
+
+
+class Fixture:
+    """Seeded users with their tokens and object ids, picked at random by the scenarios"""
+
+    def __init__(self, user_ids, active_users, prefix):
+        User = get_user_model()
+        self.prefix = prefix
+        self.password = secrets.token_urlsafe(16)
+        self.users = random.sample(user_ids, min(active_users, len(user_ids)))
+        Token.objects.bulk_create([Token(user_id=user_id, key=Token.generate_key()) for user_id in self.users])
+        self.tokens = dict(Token.objects.filter(user_id__in=self.users).values_list('user_id', 'key'))
+        self.tags = self.ids_by_user(Tag)
+        self.ingredients = self.ids_by_user(Ingredient)
+        self.recipes = self.ids_by_user(Recipe)
+
+        self.login = User.objects.create_user(f'{prefix}login@example.com', self.password)
+        admin = User.objects.create_superuser(f'{prefix}admin@example.com', secrets.token_urlsafe(32))
+        self.admin_token = Token.objects.create(user=admin).key
+        self.counter = itertools.count()
+
+    def ids_by_user(self, model):
+        ids = {}
+        for user_id, pk in model.objects.filter(user_id__in=self.users).values_list('user_id', 'id'):
+            ids.setdefault(user_id, []).append(str(pk))
+        return ids
+
+    def user(self):
+        """A random active user and the authorization header for it"""
+        user_id = random.choice(self.users)
+        return user_id, {'authorization': f'Token {self.tokens[user_id]}'}
+
+    def admin(self):
+        return {'authorization': f'Token {self.admin_token}'}
+
+    def recipe_payload(self, user_id):
+        return {
+            'title': f'Bench recipe {next(self.counter)}',
+            'time_minutes': random.randint(5, 120),
+            'price': f'{random.randint(100, 5000) / 100:.2f}',
+            'tags': random.sample(self.tags[user_id], 2),
+            'ingredients': random.sample(self.ingredients[user_id], 3),
+        }
+
+    def new_recipe(self, user_id):
+        """Create a recipe outside the measurement for the scenarios that destroy one"""
+        return str(Recipe.objects.create(user_id=user_id, title='Bench scratch', time_minutes=5, price=1).id)
+
+    def email(self):
+        return f'{self.prefix}new{next(self.counter)}@example.com'
+
+
+def scenario_list(fx):
+    """Name, expected status and a function preparing (method, path, data, headers) for every route"""
+
+    def get(url_name, expected=200, params='', admin=False, **kwargs):
+        def prepare():
+            user_id, headers = fx.user()
+            args = [random.choice(fx.recipes[user_id])] if kwargs.get('detail') else []
+            return 'GET', reverse(url_name, args=args) + params, None, fx.admin() if admin else headers
+        return prepare
+
+    def create_recipe():
+        user_id, headers = fx.user()
+        return 'POST', reverse('recipes:recipes-list'), fx.recipe_payload(user_id), headers
+
+    def create_named(url_name):
+        def prepare():
+            _, headers = fx.user()
+            return 'POST', reverse(url_name), {'name': f'Bench {next(fx.counter)}'}, headers
+        return prepare
+
+    def update_recipe():
+        user_id, headers = fx.user()
+        url = reverse('recipes:recipes-detail', args=[random.choice(fx.recipes[user_id])])
+        return 'PUT', url, fx.recipe_payload(user_id), headers
+
+    def patch_recipe():
+        user_id, headers = fx.user()
+        url = reverse('recipes:recipes-detail', args=[random.choice(fx.recipes[user_id])])
+        return 'PATCH', url, {'title': f'Bench patched {next(fx.counter)}'}, headers
+
+    def delete_recipe():
+        user_id, headers = fx.user()
+        return 'DELETE', reverse('recipes:recipes-detail', args=[fx.new_recipe(user_id)]), None, headers
+
+    def filter_recipes():
+        user_id, headers = fx.user()
+        tags = ','.join(random.sample(fx.tags[user_id], 2))
+        return 'GET', reverse('recipes:recipes-list') + f'?tags={tags}', None, headers
+
+    def create_user(url_name):
+        def prepare():
+            return 'POST', reverse(url_name), {'email': fx.email(), 'password': fx.password, 'name': 'Bench'}, {}
+        return prepare
+
+    def token():
+        return 'POST', reverse('user:token'), {'email': fx.login.email, 'password': fx.password}, {}
+
+    def patch_me():
+        _, headers = fx.user()
+        return 'PATCH', reverse('user:me'), {'name': f'Bench {next(fx.counter)}'}, headers
+
+    return [
+        ('tags.list', 200, get('recipes:tags-list')),
+        ('tags.create', 201, create_named('recipes:tags-list')),
+        ('ingredients.list', 200, get('recipes:ingredients-list')),
+        ('ingredients.create', 201, create_named('recipes:ingredients-list')),
+        ('recipes.list', 200, get('recipes:recipes-list')),
+        ('recipes.list_summary', 200, get('recipes:recipes-list', params='?summary=true')),
+        ('recipes.list_expanded', 200, get('recipes:recipes-list', params='?expand=ingredients,tags')),
+        ('recipes.list_filtered', 200, filter_recipes),
+        ('recipes.retrieve', 200, get('recipes:recipes-detail', detail=True)),
+        ('recipes.create', 201, create_recipe),
+        ('recipes.update', 200, update_recipe),
+        ('recipes.partial_update', 200, patch_recipe),
+        ('recipes.destroy', 204, delete_recipe),
+        ('recipes.export', 200, get('recipes:recipes-export', params='?type=ndjson')),
+        ('recipes.search', 200, get('recipes:recipes-search', params='?q=recipe')),
+        ('recipes.async_list', 200, get('recipes:async-recipe-list')),
+        ('recipes.async_retrieve', 200, get('recipes:async-recipe-detail', detail=True)),
+        ('recipes.stats', 200, get('recipes:stats')),
+        ('recipes.cache_metrics', 200, get('recipes:cache-metrics', admin=True)),
+        ('user.create', 201, create_user('user:create_user')),
+        ('user.async_create', 201, create_user('user:async_create_user')),
+        ('user.token', 200, token),
+        ('user.me', 200, get('user:me')),
+        ('user.me_update', 200, patch_me),
+        ('user.async_me', 200, get('user:async_me')),
+        ('user.hashing_metrics', 200, get('user:hashing_metrics', admin=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Seed users with related data, run a scenario per API route and report throughput and latency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--active-users', type=int, default=100, help='Users issuing the requests')
+        parser.add_argument('--tags', type=int, default=30, help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=30, help='Ingredients per user')
+        parser.add_argument('--recipes', type=int, default=40, help='Recipes per user')
+        parser.add_argument('--fanout', type=int, default=3, help='Tags and ingredients per recipe')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Only run scenarios starting with this name, may be repeated')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, so runs are comparable')
+        parser.add_argument('--base-url',
+                            help='Benchmark a running server instead of the in-process client; data is then '
+                                 'seeded into the configured database, which that server must be using')
+        parser.add_argument('--seed-configured-database', action='store_true',
+                            help='Confirm seeding the configured database for --base-url; the users of the run '
+                                 'and their data are deleted afterwards')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='JSON results of a previous run to compare p95 latency with')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='p95 increase in percent reported as a regression by --compare')
+
+    def handle(self, *args, **options):
+        if options['base_url'] and not options['seed_configured_database']:
+            raise CommandError('--base-url seeds users and recipes into the configured database, '
+                               'pass --seed-configured-database to confirm')
+        random.seed(options['seed'])
+        # Emails unique to the run, so runs against the same database neither collide nor mix
+        prefix = f'bench-{secrets.token_hex(4)}-'
+        if options['base_url']:
+            database = self.remove_afterwards(prefix)
+            client = bench.HTTPClient(options['base_url'])
+        else:
+            database = bench.scratch_database()
+            client = bench.InProcessClient()
+
+        with database, client:
+            user_ids = bench.seed(
+                options['users'], tags=options['tags'], ingredients=options['ingredients'],
+                recipes=options['recipes'], fanout=options['fanout'], prefix=prefix, stdout=self.stdout,
+            )
+            fixture = Fixture(user_ids, options['active_users'], prefix)
+            results = {}
+            for name, expected, prepare in scenario_list(fixture):
+                if options['scenarios'] and not name.startswith(tuple(options['scenarios'])):
+                    continue
+                results[name] = self.run_scenario(client, prepare, expected, options['requests'])
+                self.report(name, results[name])
+
+        report = {'meta': self.metadata(options), 'scenarios': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    @contextlib.contextmanager
+    def remove_afterwards(self, prefix):
+        """Delete the users of the run, and with them their tokens and recipe data, when it ends"""
+        try:
+            yield
+        finally:
+            deleted, _ = get_user_model().objects.filter(email__startswith=prefix).delete()
+            self.stdout.write(f'Removed {deleted} rows of the run')
+
+    def run_scenario(self, client, prepare, expected, requests):
+        samples = []
+        errors = 0
+        for _ in range(requests):
+            method, path, data, headers = prepare()
+            started = time.perf_counter()
+            status, _ = client.request(method, path, data, headers)
+            samples.append((time.perf_counter() - started) * 1000)
+            errors += status != expected
+        stats = profiling.summarize(samples)
+        stats['rps'] = 1000 / stats['mean_ms'] if stats['mean_ms'] else 0.0
+        stats['errors'] = errors
+        return stats
+
+    def report(self, name, stats):
+        line = (f'{name}: {stats["rps"]:.0f} req/s p50={stats["p50_ms"]:.2f}ms '
+                f'p95={stats["p95_ms"]:.2f}ms p99={stats["p99_ms"]:.2f}ms')
+        if stats['errors']:
+            line = self.style.ERROR(f'{line} errors={stats["errors"]}')
+        self.stdout.write(line)
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+        except OSError:
+            commit = ''
+        keys = ('users', 'active_users', 'tags', 'ingredients', 'recipes', 'fanout', 'requests', 'seed', 'base_url')
+        return {
+            'commit': commit or None,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'options': {key: options[key] for key in keys},
+        }
+
+    def compare(self, path, results, threshold):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== p95 against {baseline["meta"].get("commit") or path} =='))
+
+        regressions = []
+        for name, stats in results.items():
+            before = baseline['scenarios'].get(name)
+            if not before or not before['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            line = f'{name}: {before["p95_ms"]:.2f}ms -> {stats["p95_ms"]:.2f}ms ({change:+.1f}%)'
+            if change > threshold:
+                regressions.append(name)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'p95 regressed by more than {threshold}% in: {", ".join(regressions)}')
@@ -0,0 +1,50 @@
+from django.core import signals
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import bench, profiling
+
+
+MODES = (
+    ('new connection per request', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent', {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent with health checks', {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True}),
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request latency with and without persistent database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias, PostgreSQL being the point')
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'== {options["database"]} ({connection.vendor}, {connection.settings_dict["HOST"] or "local"}) =='
+        ))
+        original = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        baseline = None
+        try:
+            for name, overrides in MODES:
+                connection.close()
+                connection.settings_dict.update(overrides)
+                stats = profiling.summarize(bench.measure(lambda: self.request(connection), options['iterations']))
+                line = f'{name}: p50={stats["p50_ms"]:.3f}ms p95={stats["p95_ms"]:.3f}ms p99={stats["p99_ms"]:.3f}ms'
+                if baseline is None:
+                    baseline = stats['mean_ms']
+                else:
+                    line += f', {baseline - stats["mean_ms"]:.3f}ms less per request'
+                self.stdout.write(line)
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+    def request(self, connection):
+        """One request cycle as Django runs it: the request signals close connections as configured"""
+        signals.request_started.send(sender=self.__class__)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        signals.request_finished.send(sender=self.__class__)
@@ -0,0 +1,71 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from core import bench, profiling
+from core.models import Tag, Ingredient, Recipe
+
+
+# Index layout before the composite indexes were introduced: a single index on the user FK
+BASELINE_INDEXES = {
+    Tag: models.Index(fields=['user'], name='bench_tag_user_idx'),
+    Ingredient: models.Index(fields=['user'], name='bench_ingredient_user_idx'),
+    Recipe: models.Index(fields=['user'], name='bench_recipe_user_idx'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Seed a scratch database and compare per-user list latency with and without the composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=30, help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=30, help='Ingredients per user')
+        parser.add_argument('--recipes', type=int, default=40, help='Recipes per user')
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with bench.scratch_database() as connection:
+            user_ids = bench.seed(
+                options['users'], options['tags'], options['ingredients'], options['recipes'], stdout=self.stdout
+            )
+            queries = self.build_queries(user_ids, options['page_size'])
+
+            with connection.schema_editor() as editor:
+                for model, index in BASELINE_INDEXES.items():
+                    for composite in model._meta.indexes:
+                        editor.remove_index(model, composite)
+                    editor.add_index(model, index)
+            self.report('before', queries, options['iterations'])
+
+            with connection.schema_editor() as editor:
+                for model, index in BASELINE_INDEXES.items():
+                    editor.remove_index(model, index)
+                    for composite in model._meta.indexes:
+                        editor.add_index(model, composite)
+            self.report('after', queries, options['iterations'])
+
+    def build_queries(self, user_ids, page_size):
+        """Querysets mirroring the list and lookup access patterns of the API"""
+        def pick():
+            return random.choice(user_ids)
+
+        return {
+            'recipes.list': lambda: Recipe.objects.filter(user_id=pick()).order_by('id')[:page_size + 1],
+            'tags.list': lambda: Tag.objects.filter(user_id=pick()).order_by('id')[:page_size + 1],
+            'ingredients.list': lambda: Ingredient.objects.filter(user_id=pick()).order_by('id')[:page_size + 1],
+            'tags.by_name': lambda: Tag.objects.filter(user_id=pick(), name='Tag 1'),
+            'ingredients.by_name': lambda: Ingredient.objects.filter(user_id=pick(), name='Ingredient 1'),
+            'recipes.by_title': lambda: Recipe.objects.filter(user_id=pick(), title='Recipe 1'),
+        }
+
+    def report(self, label, queries, iterations):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {label} =='))
+        for name, build in queries.items():
+            self.stdout.write(f'{name}: {build().explain()}')
+            stats = profiling.summarize(bench.measure(lambda: list(build()), iterations))
+            self.stdout.write(
+                f'{name}: p50={stats["p50_ms"]:.3f}ms p99={stats["p99_ms"]:.3f}ms over {stats["count"]} runs'
+            )
@@ -0,0 +1,88 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import bench, profiling
+
+
+class Command(BaseCommand):
+    help = ('Compare read, write and login throughput of concurrent API workers on SQLite with and without '
+            'SQLITE_TUNING')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Fraction of requests that write')
+        parser.add_argument('--login-ratio', type=float, default=0.1,
+                            help='Fraction of requests that obtain a token, hashing the password')
+        parser.add_argument('--users', type=int, default=20)
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+
+        for name, tuned in (('default', False), ('tuned', True)):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+            with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_TUNING=tuned):
+                # WAL needs a database file, the test runner would use an in-memory one
+                connection.settings_dict['TEST'] = {**connection.settings_dict['TEST'],
+                                                    'NAME': os.path.join(directory, 'bench.sqlite3')}
+                # The outer client only lets the testserver host through for the per-worker ones
+                with bench.scratch_database(), bench.InProcessClient():
+                    self.run_mode(options)
+
+    def run_mode(self, options):
+        user_ids = bench.seed(options['users'], recipes=20)
+        tokens = [Token.objects.create(user_id=user_id).key for user_id in user_ids]
+        login = {'email': 'bench-login@example.com', 'password': 'benchpass123'}
+        get_user_model().objects.create_user(**login)
+        local = threading.local()
+        timings = {'read': [], 'write': [], 'login': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def request():
+            if not hasattr(local, 'client'):
+                # One client and handler per worker, like one server thread each
+                local.client = bench.InProcessClient()
+            headers = {'authorization': f'Token {random.choice(tokens)}'}
+            draw = random.random()
+            if draw < options['login_ratio']:
+                kind = 'login'
+            elif draw < options['login_ratio'] + options['write_ratio']:
+                kind = 'write'
+            else:
+                kind = 'read'
+            started = time.perf_counter()
+            try:
+                if kind == 'login':
+                    status, _ = local.client.request('POST', reverse('user:token'), login)
+                elif kind == 'write':
+                    status, _ = local.client.request('POST', reverse('recipes:tags-list'),
+                                                     {'name': f'Tag {random.random()}'}, headers)
+                else:
+                    status, _ = local.client.request('GET', reverse('recipes:recipes-list') + '?summary=true',
+                                                     None, headers)
+                failed = status >= 400
+            except Exception:
+                # "database is locked" surfaces as an OperationalError from the view
+                failed = True
+            with lock:
+                timings[kind].append((time.perf_counter() - started) * 1000)
+                timings['errors'] += failed
+
+        _, elapsed = bench.measure_threaded(request, options['requests'], options['workers'])
+        for kind in ('read', 'write', 'login'):
+            stats = profiling.summarize(timings[kind])
+            self.stdout.write(f'{kind}: {len(timings[kind]) / elapsed:.0f}/s p50={stats["p50_ms"]:.2f}ms '
+                              f'p95={stats["p95_ms"]:.2f}ms p99={stats["p99_ms"]:.2f}ms')
+        self.stdout.write(f'errors: {timings["errors"]}')
@@ -0,0 +1,63 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections, models, transaction
+
+from core.models import uuid7
+
+
+SCHEMES = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare primary key insert throughput of random and time ordered UUIDs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='Database alias to benchmark, may be repeated (default: default)')
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for alias in options['databases'] or ['default']:
+            connection = connections[alias]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {alias} ({connection.vendor}) =='))
+            for name, generator in SCHEMES.items():
+                rate, size = self.run_scheme(connection, name, generator, options['rows'], options['batch_size'])
+                line = f'{name}: {rate:,.0f} rows/s'
+                if size is not None:
+                    line += f', primary key index {size / 1024 / 1024:.1f} MiB'
+                self.stdout.write(line)
+
+    def run_scheme(self, connection, name, generator, rows, batch_size):
+        """Insert rows into a temporary table keyed by the generator and return (rows/s, index bytes)"""
+        table = connection.ops.quote_name(f'bench_{name}')
+        column_type = models.UUIDField().db_type(connection)
+        field = models.UUIDField()
+        insert = f'INSERT INTO {table} (id, payload) VALUES (%s, %s)'
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMPORARY TABLE {table} (id {column_type} PRIMARY KEY, payload varchar(64))')
+            try:
+                started = time.perf_counter()
+                for first in range(0, rows, batch_size):
+                    count = min(batch_size, rows - first)
+                    params = [
+                        (field.get_db_prep_value(generator(), connection), 'x' * 64) for _ in range(count)
+                    ]
+                    with transaction.atomic(using=connection.alias):
+                        cursor.executemany(insert, params)
+                elapsed = time.perf_counter() - started
+
+                size = None
+                if connection.vendor == 'postgresql':
+                    cursor.execute('SELECT pg_relation_size(%s)', [f'bench_{name}_pkey'])
+                    size = cursor.fetchone()[0]
+            finally:
+                cursor.execute(f'DROP TABLE {table}')
+
+        return rows / elapsed, size
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import sharding
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+from recipes import caching, search, stats
+
+
+MODELS = (Tag, Ingredient, Recipe)
+THROUGH_MODELS = (Recipe.tags.through, Recipe.ingredients.through)
+
+
+class Command(BaseCommand):
+    help = "Move each user's recipe data to the shard the hash ring assigns, e.g. after adding a shard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', action='append', dest='sources',
+                            help='Database to move users off, may be repeated (default: DATABASE_SHARDS). '
+                                 'Use default when turning sharding on, or a shard being removed.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report the users that would move')
+
+    def handle(self, *args, **options):
+        if not sharding.is_enabled():
+            raise CommandError('DATABASE_SHARDS is empty, there is nothing to rebalance')
+
+        total = 0
+        for source in options['sources'] or settings.DATABASE_SHARDS:
+            moves = {}
+            for user_id in self.user_ids(source):
+                target = sharding.shard_for_user(user_id)
+                if target != source:
+                    moves.setdefault(target, []).append(user_id)
+
+            for target, user_ids in moves.items():
+                self.stdout.write(f'{source} -> {target}: {len(user_ids)} users')
+                if options['dry_run']:
+                    continue
+                for user_id in user_ids:
+                    self.move_user(user_id, source, target, options['batch_size'])
+            total += sum(len(user_ids) for user_ids in moves.values())
+
+        verb = 'would move' if options['dry_run'] else 'moved'
+        self.stdout.write(self.style.SUCCESS(f'{total} users {verb}'))
+
+    def user_ids(self, using):
+        user_ids = set()
+        for model in MODELS:
+            user_ids.update(model.objects.using(using).order_by().values_list('user_id', flat=True).distinct())
+        return sorted(user_ids)
+
+    def move_user(self, user_id, source, target, batch_size):
+        """Copy the user's rows to target, then delete them from source
+
+        The two databases commit separately. Leftovers of an interrupted run on target are
+        cleared before copying, so running the command again finishes the move.
+        """
+        with transaction.atomic(using=target):
+            self.delete_user_rows(user_id, target)
+            for model in MODELS:
+                rows = list(model.objects.using(source).filter(user_id=user_id))
+                model.objects.using(target).bulk_create(rows, batch_size=batch_size)
+            for through in THROUGH_MODELS:
+                links = list(through.objects.using(source).filter(recipe__user_id=user_id))
+                for link in links:
+                    link.pk = None
+                through.objects.using(target).bulk_create(links, batch_size=batch_size)
+            recipe_ids = list(Recipe.objects.using(target).filter(user_id=user_id).values_list('id', flat=True))
+            search.index_recipes(recipe_ids, using=target)
+            # The copies bypassed the signals, so the summary rows are rebuilt rather than copied
+            stats.repair(target, user_ids=[user_id])
+
+        with transaction.atomic(using=source):
+            self.delete_user_rows(user_id, source)
+
+        for model in MODELS:
+            caching.invalidate(model, user_id)
+
+    def delete_user_rows(self, user_id, using):
+        for model in (Recipe, Tag, Ingredient, RecipeStats):
+            model.objects.using(using).filter(user_id=user_id).delete()
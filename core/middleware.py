@@ -0,0 +1,101 @@
+import contextlib
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from core import profiling
+
+
+logger = logging.getLogger('core.profiling')
+
+
+def view_name(view_func, method):
+    """Name a view like RecipeViewSet.list, using the DRF action when there is one"""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class ProfilingMiddleware:
+    """Profile a sample of requests: query count, DB, serializer and total time per view
+
+    Results go out as one JSON line on the core.profiling logger, and as a Server-Timing header
+    for staff users or with DEBUG on. PROFILING_SAMPLE_RATE is the fraction of requests
+    profiled, 0 turning profiling off.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with profiling.activate(profiling.Profile()) as profile, contextlib.ExitStack() as stack:
+            self.wrap_connections(stack, profile)
+            response = self.get_response(request)
+        return self.report(request, response, profile, started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        with profiling.activate(profiling.Profile()) as profile:
+            # Queries run on the sync_to_async thread of the request, with connections of its own
+            stack = contextlib.ExitStack()
+            await sync_to_async(self.wrap_connections)(stack, profile)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self.report(request, response, profile, started)
+
+    def sampled(self):
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def wrap_connections(self, stack, profile):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile.execute))
+
+    def report(self, request, response, profile, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        view = getattr(request, 'profiling_view', None)
+        # DRF sets the user it authenticated on the request as well
+        if settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False):
+            response['Server-Timing'] = self.server_timing(profile, total_ms)
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            **{f'{name}_ms': round(ms, 3) for name, ms in profile.timings.items()},
+            'total_ms': round(total_ms, 3),
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if profiling.current() is not None:
+            request.profiling_view = view_name(view_func, request.method.lower())
+
+    def server_timing(self, profile, total_ms):
+        metrics = [f'db;dur={profile.timings.get("db", 0.0):.2f};desc="{profile.queries} queries"']
+        metrics += [f'{name};dur={ms:.2f}' for name, ms in profile.timings.items() if name != 'db']
+        metrics.append(f'total;dur={total_ms:.2f}')
+        return ', '.join(metrics)
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_recipe_search USING fts5("
+    "recipe_id, user_id, title, ingredients, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "INSERT INTO core_recipe_search (recipe_id, user_id, title, ingredients) "
+    "SELECT r.id, r.user_id, r.title, COALESCE(group_concat(i.name, ' '), '') FROM core_recipe r "
+    "LEFT JOIN core_recipe_ingredients ri ON ri.recipe_id = r.id "
+    "LEFT JOIN core_ingredient i ON i.id = ri.ingredient_id GROUP BY r.id",
+]
+
+POSTGRESQL_FORWARD = [
+    "CREATE TABLE core_recipe_search ("
+    "recipe_id uuid PRIMARY KEY REFERENCES core_recipe (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "user_id uuid NOT NULL, document tsvector NOT NULL)",
+    "CREATE INDEX core_recipe_search_document_idx ON core_recipe_search USING GIN (document)",
+    "CREATE INDEX core_recipe_search_user_idx ON core_recipe_search (user_id)",
+    "INSERT INTO core_recipe_search (recipe_id, user_id, document) "
+    "SELECT r.id, r.user_id, setweight(to_tsvector('simple', r.title), 'A') || "
+    "setweight(to_tsvector('simple', COALESCE(string_agg(i.name, ' '), '')), 'B') FROM core_recipe r "
+    "LEFT JOIN core_recipe_ingredients ri ON ri.recipe_id = r.id "
+    "LEFT JOIN core_ingredient i ON i.id = ri.ingredient_id GROUP BY r.id",
+]
+
+FORWARD = {
+    'sqlite': SQLITE_FORWARD,
+    'postgresql': POSTGRESQL_FORWARD,
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in FORWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in FORWARD:
+        schema_editor.execute('DROP TABLE core_recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_updated_at_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_stats(apps, schema_editor):
+    """Fill the summary tables from the existing recipes and links"""
+    using = schema_editor.connection.alias
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    per_user = Recipe.objects.using(using).order_by().values('user_id').annotate(
+        count=models.Count('id'), price=models.Sum('price'), minutes=models.Sum('time_minutes'),
+    )
+    RecipeStats.objects.using(using).bulk_create([
+        RecipeStats(user_id=row['user_id'], recipe_count=row['count'],
+                    price_total=row['price'], time_minutes_total=row['minutes'])
+        for row in per_user
+    ], batch_size=1000)
+
+    for name, usage_name, field in (('Tag', 'TagUsage', 'tag'), ('Ingredient', 'IngredientUsage', 'ingredient')):
+        Model = apps.get_model('core', name)
+        Usage = apps.get_model('core', usage_name)
+        rows = Model.objects.using(using).annotate(uses=models.Count('recipe')).values_list('id', 'user_id', 'uses')
+        Usage.objects.using(using).bulk_create([
+            Usage(**{f'{field}_id': pk}, user_id=user_id, recipe_count=uses) for pk, user_id, uses in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_shard_friendly_user_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.tag')),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-recipe_count'], name='core_tagusage_user_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientUsage',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.ingredient')),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-recipe_count'], name='core_ingrusage_user_count_idx')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,20 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
+import os
+import time
 import uuid
 
+
+def uuid7():
+    """Time ordered UUID (version 7 layout) so new rows append to the end of the primary key index"""
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
 # Create your models here.
 class UserManager(BaseUserManager):
 
@@ -29,7 +41,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
-    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    id = models.UUIDField(default=uuid7, primary_key=True, editable=False)
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
@@ -38,8 +50,17 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Tag(models.Model):
     """Tag for recipes"""
     name = models.CharField(max_length=255)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    # No constraint, the user may live on another database than this row's shard
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False, db_constraint=False)
+    id = models.UUIDField(default=uuid7, primary_key=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_tag_user_id_idx'),
+            models.Index(fields=['user', 'name'], name='core_tag_user_name_idx'),
+            models.Index(fields=['user', 'updated_at'], name='core_tag_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -48,23 +69,94 @@ class Tag(models.Model):
 class Ingredient(models.Model):
     """Ingredient for recipes"""
     name = models.CharField(max_length=255)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
+    # No constraint, the user may live on another database than this row's shard
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False, db_constraint=False)
+    id = models.UUIDField(default=uuid7, primary_key=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_ingredient_user_id_idx'),
+            models.Index(fields=['user', 'name'], name='core_ingredient_user_name_idx'),
+            models.Index(fields=['user', 'updated_at'], name='core_ingr_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+# Recipe fields summed up in RecipeStats
+STATS_FIELDS = ('price', 'time_minutes')
+
+
 class Recipe(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # No constraint, the user may live on another database than this row's shard
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False, db_constraint=False)
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField(Ingredient)
     tags = models.ManyToManyField(Tag)
-    id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
-
+    id = models.UUIDField(default=uuid7, primary_key=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx'),
+            models.Index(fields=['user', 'title'], name='core_recipe_user_title_idx'),
+            models.Index(fields=['user', 'updated_at'], name='core_recipe_user_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kept so the stats handlers can apply the difference when the recipe is saved again
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in STATS_FIELDS
+        }
+        return instance
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class RecipeStats(models.Model):
+    """Recipe count and totals per user, maintained by recipes.stats as recipes change"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                db_constraint=False)
+    recipe_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    time_minutes_total = models.BigIntegerField(default=0)
+
+    @property
+    def average_price(self):
+        return self.price_total / self.recipe_count if self.recipe_count else None
+
+    @property
+    def average_time_minutes(self):
+        return self.time_minutes_total / self.recipe_count if self.recipe_count else None
+
+
+class TagUsage(models.Model):
+    """Number of recipes linked to a tag, maintained by recipes.stats"""
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False, db_constraint=False)
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-recipe_count'], name='core_tagusage_user_count_idx'),
+        ]
+
+
+class IngredientUsage(models.Model):
+    """Number of recipes linked to an ingredient, maintained by recipes.stats"""
+    ingredient = models.OneToOneField(Ingredient, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False, db_constraint=False)
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-recipe_count'], name='core_ingrusage_user_count_idx'),
+        ]
\ No newline at end of file
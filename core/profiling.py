@@ -0,0 +1,93 @@
+"""Per-request performance profile shared by the profiling middleware and the code it measures
+
+The middleware activates a Profile for sampled requests only. Elsewhere phase() and record()
+check a context variable and return at once, so unsampled requests pay next to nothing.
+summarize() turns latency samples into the figures reported by the benchmarks and pool stats.
+"""
+import contextlib
+import contextvars
+import statistics
+import time
+
+
+_current = contextvars.ContextVar('profile', default=None)
+_inactive = contextlib.nullcontext()
+
+
+class Profile:
+    """Query count plus milliseconds per phase; phases may overlap, e.g. queries run while serializing"""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = {}
+        self.active = set()
+
+    def add(self, name, ms):
+        self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def execute(self, execute, sql, params, many, context):
+        """Connection execute wrapper counting queries and their time"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', (time.perf_counter() - started) * 1000)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active.discard(name)
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def activate(profile):
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+def phase(name):
+    """Time the block as the named phase of the current profile, counting nested blocks once"""
+    profile = _current.get()
+    if profile is None or name in profile.active:
+        return _inactive
+    return profile.phase(name)
+
+
+def record(name, ms):
+    """Add time measured elsewhere, e.g. on a worker thread, to the current profile"""
+    profile = _current.get()
+    if profile is not None:
+        profile.add(name, ms)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of the samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """Return the latency figures reported by every benchmark"""
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) if samples else 0.0,
+        'p50_ms': percentile(samples, 50),
+        'p95_ms': percentile(samples, 95),
+        'p99_ms': percentile(samples, 99),
+    }
@@ -0,0 +1,174 @@
+"""Database routers: recipe data to the user's shard, then primary/replica routing for the rest
+
+ShardRouter comes first and only answers for the sharded models, see core.sharding. For the
+other models, reads of safe requests go to DATABASE_REPLICAS and everything else to default;
+ReplicaRoutingMiddleware decides per request. Outside of a request, e.g. in management commands,
+and for a while after a user's last write, every query uses the primary so it sees its own writes.
+"""
+import contextlib
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject, empty
+
+from core import sharding
+
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Tokens are created by one request and used by the next, too soon for a lagging replica
+PRIMARY_ONLY_MODELS = {'authtoken.token'}
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+@contextlib.contextmanager
+def replica_reads(enabled=True):
+    token = _read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def sticky_cache_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def stick_to_primary(user_id):
+    """Send the user's reads to the primary for REPLICA_STICKY_SECONDS, whichever credential they use"""
+    if settings.DATABASE_REPLICAS:
+        cache = caches[settings.REPLICA_STICKY_CACHE_ALIAS]
+        cache.set(sticky_cache_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user_id):
+    return bool(caches[settings.REPLICA_STICKY_CACHE_ALIAS].get(sticky_cache_key(user_id)))
+
+
+def replica_may_lag(user_id):
+    """Whether the current request read from a replica that may miss the user's latest write"""
+    return bool(settings.DATABASE_REPLICAS) and bool(_read_from_replica.get()) and is_sticky(user_id)
+
+
+def resolved_user(request):
+    """The request's user once authentication ran, else None, without a lazy session lookup"""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user
+
+
+class RequestReplicaReads:
+    """Truthy while the reads of a safe request may go to a replica
+
+    The user is only known once DRF authenticated the request, so the first read after that
+    decides for the rest of the request. Reads before it, like token lookups, use the primary.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.decision = None
+
+    def __bool__(self):
+        if self.decision is None:
+            user = resolved_user(self.request)
+            if user is None:
+                return False
+            self.decision = not (user.is_authenticated and is_sticky(user.pk))
+        return self.decision
+
+
+class ShardRouter:
+
+    def _shard(self, model, **hints):
+        if not sharding.is_enabled() or model._meta.label_lower not in sharding.SHARDED_MODELS:
+            return None
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._state.db:
+                return instance._state.db
+            if getattr(instance, 'user_id', None) is not None:
+                return sharding.shard_for_user(instance.user_id)
+        return sharding.current()
+
+    db_for_read = _shard
+    db_for_write = _shard
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows point at users on default, their foreign keys have no constraint
+        labels = {obj1._meta.label_lower, obj2._meta.label_lower}
+        if labels & sharding.SHARDED_MODELS and sharding.is_enabled():
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in settings.DATABASE_SHARDS or model_name is None:
+            return None
+        return f'{app_label}.{model_name}' in sharding.SHARDED_MODELS
+
+
+class PrimaryReplicaRouter:
+
+    def _pinned(self, hints):
+        """Database of an instance loaded with an explicit using(), unless that is a replica"""
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and instance._state.db not in settings.DATABASE_REPLICAS:
+            return instance._state.db
+        return None
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _read_from_replica.get() or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return self._pinned(hints) or PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return self._pinned(hints) or PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Serve reads of safe requests from replicas unless the user wrote within REPLICA_STICKY_SECONDS"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method in SAFE_METHODS:
+            with replica_reads(bool(settings.DATABASE_REPLICAS) and RequestReplicaReads(request)):
+                return self.get_response(request)
+
+        response = self.get_response(request)
+        user = resolved_user(request)
+        if user is not None and user.is_authenticated:
+            stick_to_primary(user.pk)
+        return response
+
+    async def __acall__(self, request):
+        if request.method in SAFE_METHODS:
+            # The context variable is copied into the sync_to_async threads running the queries
+            with replica_reads(bool(settings.DATABASE_REPLICAS) and RequestReplicaReads(request)):
+                return await self.get_response(request)
+
+        response = await self.get_response(request)
+        user = resolved_user(request)
+        if user is not None and user.is_authenticated:
+            await sync_to_async(stick_to_primary)(user.pk)
+        return response
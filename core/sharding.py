@@ -0,0 +1,79 @@
+"""Per-user sharding of the recipe data: tags, ingredients, recipes, their links and stats
+
+Each user maps to one of DATABASE_SHARDS through a consistent hash ring, so adding a shard
+moves only about 1/N of the users. Users and tokens stay on the default database. Requests
+activate the shard of the authenticated user and core.routers.ShardRouter sends the recipe
+data queries there. With DATABASE_SHARDS empty everything stays on default.
+"""
+import bisect
+import contextlib
+import contextvars
+import functools
+import hashlib
+
+from django.conf import settings
+
+
+SHARDED_MODELS = {
+    'core.tag', 'core.ingredient', 'core.recipe', 'core.recipe_tags', 'core.recipe_ingredients',
+    'core.recipestats', 'core.tagusage', 'core.ingredientusage',
+}
+
+VIRTUAL_NODES = 128
+
+_current = contextvars.ContextVar('shard', default=None)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes to even out the share of each shard"""
+
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        points = sorted((_hash(f'{shard}#{node}'), shard) for shard in shards for node in range(virtual_nodes))
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def get(self, key):
+        index = bisect.bisect(self.hashes, _hash(str(key))) % len(self.hashes)
+        return self.shards[index]
+
+
+@functools.lru_cache(maxsize=None)
+def _ring(shards):
+    return HashRing(shards)
+
+
+def is_enabled():
+    return bool(settings.DATABASE_SHARDS)
+
+
+def shard_for_user(user_id):
+    """Database alias holding the user's recipe data"""
+    if not settings.DATABASE_SHARDS:
+        return 'default'
+    return _ring(tuple(settings.DATABASE_SHARDS)).get(user_id)
+
+
+def current():
+    return _current.get()
+
+
+def activate(user):
+    """Route recipe data queries to the user's shard until deactivate() is called with the token"""
+    return _current.set(shard_for_user(user.pk) if user.is_authenticated else None)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def for_user(user):
+    token = activate(user)
+    try:
+        yield _current.get()
+    finally:
+        deactivate(token)
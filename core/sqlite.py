@@ -0,0 +1,150 @@
+"""Opt-in SQLite profile for concurrent deployments, enabled with SQLITE_TUNING
+
+Every new SQLite connection gets SQLITE_PRAGMAS: WAL so readers never wait for the writer,
+synchronous=NORMAL, a larger page cache, memory mapped reads and a busy timeout. SQLite
+still allows a single writer, so SQLiteWriteQueueMiddleware makes the write transactions of a
+process wait their turn in the order they arrived instead of failing with "database is locked".
+Only the transaction waits: password hashing and rendering of a writing request run in parallel.
+"""
+import contextlib
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class WriteQueue:
+    """Turns of one database's writers, served in the order they asked"""
+
+    def __init__(self):
+        # threading.Lock has no fairness guarantee, a Condition with tickets serves writers in order
+        self.turn = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+
+    def acquire(self):
+        with self.turn:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.turn.wait_for(lambda: self.serving == ticket)
+
+    def release(self):
+        with self.turn:
+            self.serving += 1
+            self.turn.notify_all()
+
+
+class QueuedWriter:
+    """Execute wrapper holding a connection's turn in the write queue while it writes
+
+    Atomic blocks start with BEGIN, which becomes BEGIN IMMEDIATE once the turn is taken: a
+    deferred transaction that reads first fails without waiting under WAL when it later needs
+    the write lock. The turn is given back once the transaction commits or rolls back. Single
+    writes outside a transaction hold the turn for that statement only.
+    """
+
+    def __init__(self, queue, connection):
+        self.queue = queue
+        self.connection = connection
+        self.holding = False
+        self.on_commit_set = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.holding and not self.connection.in_atomic_block:
+            # The transaction holding the turn was rolled back
+            self.release()
+        elif self.holding and not self.on_commit_set:
+            # BEGIN runs before the atomic block is entered, so the hook is added on the next statement
+            self.connection.on_commit(self.release)
+            self.on_commit_set = True
+
+        statement = sql.lstrip()[:7].upper()
+        if statement == 'BEGIN':
+            self.acquire()
+            return execute('BEGIN IMMEDIATE', params, many, context)
+        if self.holding or not statement.startswith(WRITE_STATEMENTS):
+            return execute(sql, params, many, context)
+
+        self.acquire()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not self.connection.in_atomic_block:
+                self.release()
+
+    def acquire(self):
+        self.queue.acquire()
+        self.holding = True
+
+    def release(self):
+        if self.holding:
+            self.holding = False
+            self.on_commit_set = False
+            self.queue.release()
+
+
+class SQLiteWriteQueueMiddleware:
+    """Serialize the write transactions of requests with unsafe methods, per SQLite database"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SQLITE_TUNING or connections['default'].vendor != 'sqlite':
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.queues = {
+            alias: WriteQueue() for alias in connections
+            if connections.settings[alias]['ENGINE'] == 'django.db.backends.sqlite3'
+        }
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+
+        stack = self.queue_writes()
+        try:
+            return self.get_response(request)
+        finally:
+            stack.close()
+
+    async def __acall__(self, request):
+        if request.method in SAFE_METHODS:
+            return await self.get_response(request)
+
+        # Queries run on the sync_to_async thread of the request, with connections of its own
+        stack = await sync_to_async(self.queue_writes)()
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+
+    def queue_writes(self):
+        """Wrap this thread's SQLite connections, closing the returned stack gives the turns back"""
+        stack = contextlib.ExitStack()
+        for alias, queue in self.queues.items():
+            writer = QueuedWriter(queue, connections[alias])
+            stack.enter_context(writer.connection.execute_wrapper(writer))
+            stack.callback(writer.release)
+        return stack
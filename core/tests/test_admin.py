@@ -1,4 +1,4 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -35,4 +35,19 @@ class AdminSiteTests(TestCase):
         url = reverse('admin:core_user_add')
         response = self.client.get(url)
 
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+    def test_recipe_data_pages(self):
+        url = reverse('admin:core_recipe_changelist')
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DATABASE_SHARDS=['shard1', 'shard2'])
+    def test_recipe_data_hidden_when_sharded(self):
+        """Test the recipe data pages are disabled rather than showing the default database"""
+        response = self.client.get(reverse('admin:index'))
+        self.assertNotContains(response, reverse('admin:core_recipe_changelist'))
+
+        response = self.client.get(reverse('admin:core_tag_changelist'))
+        self.assertEqual(response.status_code, 403)
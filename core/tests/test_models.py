@@ -1,3 +1,6 @@
+import time
+import uuid
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -63,4 +66,22 @@ class ModelTest(TestCase):
         """Test __str__ method in recipe model"""
         recipe = models.Recipe.objects.create(user=sample_user(), title='Steak and mushroom sauce', time_minutes=5, price=5.00)
 
-        self.assertEqual(str(recipe), recipe.title)
\ No newline at end of file
+        self.assertEqual(str(recipe), recipe.title)
+
+    def test_uuid7_is_time_ordered(self):
+        """Test generated ids are version 7 UUIDs sorted by creation time"""
+        first = models.uuid7()
+        time.sleep(0.002)
+        second = models.uuid7()
+
+        self.assertEqual(first.version, 7)
+        self.assertEqual(first.variant, uuid.RFC_4122)
+        self.assertLess(first, second)
+
+    def test_new_rows_use_time_ordered_ids(self):
+        """Test models default to time ordered primary keys"""
+        user = sample_user()
+        tag = models.Tag.objects.create(user=user, name='vegan')
+
+        self.assertEqual(user.id.version, 7)
+        self.assertEqual(tag.id.version, 7)
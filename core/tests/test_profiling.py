@@ -0,0 +1,77 @@
+import json
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.middleware import ProfilingMiddleware
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipes:recipes-list')
+TOKEN_URL = reverse('user:token')
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_request_reports_timings(self):
+        """Test a profiled request gets Server-Timing and a JSON log line tagged by view action"""
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.client.get(RECIPES_URL)
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", .*serialize;dur=')
+        self.assertIn('total;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'RecipeViewSet.list')
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(record['status'], 200)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, DEBUG=True)
+    def test_login_reports_hashing_time(self):
+        """Test time spent on the password hashing pool shows up in the profile"""
+        with self.assertLogs('core.profiling', 'INFO'):
+            response = APIClient().post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'testpass123'})
+
+        self.assertIn('hashing;dur=', response['Server-Timing'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_timings_header_for_staff_only(self):
+        """Test other users' requests are logged without exposing the timings to the client"""
+        with self.assertLogs('core.profiling', 'INFO'):
+            response = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_untouched(self):
+        """Test requests outside the sample carry no profiling header"""
+        response = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    async def test_async_request_counts_queries(self):
+        """Test async views are profiled natively, counting the queries of their sync_to_async calls"""
+        async def view(request):
+            await sync_to_async(Recipe.objects.count)()
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            await middleware(RequestFactory().get('/'))
+
+        self.assertEqual(json.loads(logs.records[0].getMessage())['queries'], 1)
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+from core.routers import ReplicaRoutingMiddleware, RequestReplicaReads, replica_reads
+from core.routers import replica_may_lag, stick_to_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.routes = []
+
+        def view(request):
+            before_auth = router.db_for_read(Recipe)
+            # Authentication as DRF does it, setting the user on the underlying request
+            request.user = request.authenticate_as
+            self.routes.append((before_auth, router.db_for_read(Recipe), router.db_for_write(Recipe)))
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+
+    def request(self, method, user_id=1):
+        request = self.factory.generic(method, '/api/recipes/recipes/')
+        request.authenticate_as = SimpleNamespace(pk=user_id, is_authenticated=True)
+        self.middleware(request)
+        return self.routes[-1][1:]
+
+    def test_safe_requests_read_from_replica(self):
+        """Test GET reads go to a replica while writes always go to the primary"""
+        self.assertEqual(self.request('GET'), ('replica1', 'default'))
+        self.assertEqual(self.request('POST'), ('default', 'default'))
+
+    def test_reads_before_authentication_use_primary(self):
+        """Test reads made before the user is known, like the token lookup, use the primary"""
+        self.request('GET')
+
+        self.assertEqual(self.routes[-1][0], 'default')
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a user who wrote reads from the primary for the window, whatever the credential"""
+        self.request('PATCH')
+
+        self.assertEqual(self.request('GET'), ('default', 'default'))
+        self.assertEqual(self.request('GET', user_id=2), ('replica1', 'default'))
+
+    def test_replica_lag_reported_once_user_wrote(self):
+        """Test a request that read from a replica learns when the user wrote in the meantime"""
+        request = self.factory.get('/')
+        request.user = SimpleNamespace(pk=1, is_authenticated=True)
+        with replica_reads(RequestReplicaReads(request)):
+            self.assertEqual(router.db_for_read(Recipe), 'replica1')
+            self.assertFalse(replica_may_lag(1))
+            stick_to_primary(1)
+            self.assertTrue(replica_may_lag(1))
+            self.assertEqual(router.db_for_read(Recipe), 'replica1')
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test code running outside a request, like management commands, reads the primary"""
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_tokens_always_read_from_primary(self):
+        """Test token lookups are not exposed to replica lag right after login"""
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Token), 'default')
+            self.assertEqual(router.db_for_read(Recipe), 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """Test everything stays on the primary without replicas"""
+        self.assertEqual(self.request('GET'), ('default', 'default'))
+
+    async def test_async_requests_routed_without_adapting(self):
+        """Test the middleware runs natively around async views and routes their queries the same way"""
+        async def view(request):
+            self.routes.append(await sync_to_async(router.db_for_read)(Recipe))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        for method in ('GET', 'POST', 'GET'):
+            request = self.factory.generic(method, '/api/recipes/recipes/')
+            request.user = SimpleNamespace(pk=1, is_authenticated=True)
+            await middleware(request)
+        self.assertEqual(self.routes, ['replica1', 'default', 'default'])
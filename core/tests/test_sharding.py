@@ -0,0 +1,127 @@
+import itertools
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import sharding
+from core.models import Tag, Recipe
+
+
+RECIPES_URL = reverse('recipes:recipes-list')
+TAGS_URL = reverse('recipes:tags-list')
+SEARCH_URL = reverse('recipes:recipes-search')
+
+SHARDS = ['shard1', 'shard2']
+
+
+def users_on(shard, count, start=0):
+    """Create users until count of them hash to the shard"""
+    users = []
+    for i in itertools.count(start):
+        user = get_user_model().objects.create_user(f'user{i}@example.com', 'testpass123')
+        if sharding.shard_for_user(user.pk) == shard:
+            users.append(user)
+            if len(users) == count:
+                return users
+
+
+class HashRingTests(TestCase):
+
+    def test_adding_shard_moves_a_fraction_of_keys(self):
+        """Test keys keep their shard and a new shard takes roughly its share"""
+        keys = range(10000)
+        before = sharding.HashRing(['a', 'b', 'c'])
+        after = sharding.HashRing(['a', 'b', 'c', 'd'])
+
+        moved = [key for key in keys if before.get(key) != after.get(key)]
+
+        self.assertTrue(all(after.get(key) == 'd' for key in moved))
+        self.assertAlmostEqual(len(moved) / len(keys), 0.25, delta=0.07)
+        self.assertEqual(before.get(42), sharding.HashRing(['a', 'b', 'c']).get(42))
+
+
+@override_settings(DATABASE_SHARDS=SHARDS)
+class ShardedApiTests(TestCase):
+    databases = {'default', *SHARDS}
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_user_data_stored_on_their_shard(self):
+        """Test tags and recipes created through the API land on the user's shard only"""
+        user = users_on('shard2', 1)[0]
+        self.client.force_authenticate(user)
+
+        tag = self.client.post(TAGS_URL, {'name': 'Vegan'}).data
+        response = self.client.post(RECIPES_URL, {
+            'title': 'Chickpea curry', 'time_minutes': 30, 'price': '7.00', 'tags': [tag['id']], 'ingredients': [],
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.using('shard2').filter(user=user).count(), 1)
+        self.assertEqual(Recipe.objects.using('shard1').count(), 0)
+        self.assertEqual(Recipe.objects.using('default').count(), 0)
+        self.assertEqual(Recipe.objects.using('shard2').get().tags.get().name, 'Vegan')
+
+    def test_reads_served_from_user_shard(self):
+        """Test list, detail, search and export only see the user's shard"""
+        first, second = users_on('shard1', 1)[0], users_on('shard2', 1, start=100)[0]
+        for user in (first, second):
+            Recipe.objects.using(sharding.shard_for_user(user.pk)).create(
+                user=user, title=f'Soup of {user.email}', time_minutes=10, price=5,
+            )
+        self.client.force_authenticate(second)
+
+        response = self.client.get(RECIPES_URL)
+        self.assertEqual([item['title'] for item in response.data['results']], [f'Soup of {second.email}'])
+
+        recipe_id = response.data['results'][0]['id']
+        response = self.client.get(reverse('recipes:recipes-detail', args=[recipe_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(SEARCH_URL, {'q': 'soup'})
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(reverse('recipes:recipes-export'), {'type': 'ndjson'})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+
+    def test_deleting_user_removes_shard_rows(self):
+        """Test removing a user clears their data on the shard, which no cascade reaches"""
+        user = users_on('shard1', 1)[0]
+        Tag.objects.using('shard1').create(user=user, name='Vegan')
+
+        user.delete()
+
+        self.assertFalse(Tag.objects.using('shard1').exists())
+
+
+class RebalanceShardsTests(TestCase):
+    databases = {'default', *SHARDS}
+
+    def test_rebalance_moves_users_to_new_shard(self):
+        """Test users the ring assigns to an added shard get all their rows moved there"""
+        with override_settings(DATABASE_SHARDS=SHARDS):
+            movers = users_on('shard2', 2)
+        for user in movers:
+            recipe = Recipe.objects.using('shard1').create(user=user, title='Soup', time_minutes=10, price=5)
+            recipe.tags.add(Tag.objects.using('shard1').create(user=user, name='Hot'))
+
+        with override_settings(DATABASE_SHARDS=SHARDS):
+            out = StringIO()
+            call_command('rebalance_shards', stdout=out)
+
+            self.assertIn('shard1 -> shard2: 2 users', out.getvalue())
+            self.assertEqual(Recipe.objects.using('shard1').count(), 0)
+            self.assertEqual(Recipe.objects.using('shard2').count(), 2)
+            recipe = Recipe.objects.using('shard2').first()
+            self.assertEqual(recipe.tags.get().name, 'Hot')
+
+            client = APIClient()
+            client.force_authenticate(movers[0])
+            response = client.get(SEARCH_URL, {'q': 'soup'})
+            self.assertEqual(len(response.data), 1)
@@ -0,0 +1,124 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.sqlite import QueuedWriter, SQLiteWriteQueueMiddleware, WriteQueue
+
+
+class SQLiteTuningTests(TestCase):
+
+    @override_settings(SQLITE_TUNING=True)
+    def test_pragmas_applied_to_new_connections(self):
+        """Test a connection opened with tuning on gets the configured pragmas"""
+        connection = connections.create_connection('default')
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 5000)
+        finally:
+            connection.close()
+
+    @override_settings(SQLITE_TUNING=False)
+    def test_write_queue_unused_without_tuning(self):
+        """Test the middleware removes itself unless the profile is on"""
+        with self.assertRaises(MiddlewareNotUsed):
+            SQLiteWriteQueueMiddleware(lambda request: HttpResponse())
+
+    def test_writes_run_one_at_a_time(self):
+        """Test write statements of different connections never overlap while reads go around the queue"""
+        queue = WriteQueue()
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def execute(sql, params, many, context):
+            with lock:
+                active.append(sql)
+                overlaps.append(active.count('INSERT'))
+            time.sleep(0.01)
+            with lock:
+                active.remove(sql)
+
+        def run(sql):
+            connection = SimpleNamespace(in_atomic_block=False)
+            QueuedWriter(queue, connection)(execute, sql, None, False, {})
+
+        threads = [threading.Thread(target=run, args=('INSERT',)) for _ in range(5)]
+        threads += [threading.Thread(target=run, args=('SELECT',)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(overlaps), 1)
+        self.assertEqual(len(overlaps), 10)
+
+    def test_transaction_holds_turn_until_it_ends(self):
+        """Test BEGIN takes the write lock upfront and the turn is held until commit"""
+        queue = WriteQueue()
+        commit_hooks = []
+        connection = SimpleNamespace(in_atomic_block=False, on_commit=commit_hooks.append)
+        writer = QueuedWriter(queue, connection)
+        executed = []
+
+        def execute(sql, params, many, context):
+            executed.append(sql)
+
+        writer(execute, 'BEGIN', None, False, {})
+        connection.in_atomic_block = True
+        writer(execute, 'INSERT INTO core_tag VALUES (1)', None, False, {})
+        self.assertEqual(executed[0], 'BEGIN IMMEDIATE')
+        self.assertEqual((queue.next_ticket, queue.serving), (1, 0))
+
+        connection.in_atomic_block = False
+        for hook in commit_hooks:
+            hook()
+        self.assertEqual((queue.next_ticket, queue.serving), (1, 1))
+
+    @override_settings(SQLITE_TUNING=True)
+    def test_requests_without_writes_overlap(self):
+        """Test unsafe requests only wait for each other while writing, e.g. not while hashing"""
+        barrier = threading.Barrier(3, timeout=5)
+        passed = []
+
+        def view(request):
+            # Times out if the requests were run one at a time
+            barrier.wait()
+            passed.append(request)
+            return HttpResponse()
+
+        middleware = SQLiteWriteQueueMiddleware(view)
+        threads = [threading.Thread(target=middleware, args=(RequestFactory().post('/'),)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(passed), 3)
+
+    @override_settings(SQLITE_TUNING=True)
+    async def test_async_requests_queue_writes_where_queries_run(self):
+        """Test async unsafe requests get the writer on the connection their sync_to_async queries use"""
+        wrapped = []
+
+        async def view(request):
+            wrapped.append(await sync_to_async(
+                lambda: any(isinstance(wrapper, QueuedWriter) for wrapper in connections['default'].execute_wrappers)
+            )())
+            return HttpResponse()
+
+        middleware = SQLiteWriteQueueMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        await middleware(RequestFactory().post('/'))
+        await middleware(RequestFactory().get('/'))
+        self.assertEqual(wrapped, [True, False])
+        self.assertEqual(connections['default'].execute_wrappers, [])
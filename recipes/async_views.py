@@ -0,0 +1,67 @@
+"""Async counterparts of the hot recipe endpoints, served natively when running under ASGI
+
+DRF views are synchronous, so these are plain Django async views reading through the async
+ORM. Serializer validation and saving still run the sync ORM and go through sync_to_async.
+"""
+import uuid
+
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import NotFound, ValidationError
+
+from core.models import Recipe
+from recipes import serializers
+from user.async_views import AsyncAPIView
+
+
+class AsyncRecipeListView(AsyncAPIView):
+    """Recipes of the user in id order, paged with ?cursor= and ?page_size="""
+    page_size = 100
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        try:
+            return max(1, min(int(request.GET.get('page_size', self.page_size)), self.max_page_size))
+        except ValueError:
+            raise ValidationError({'page_size': _('A valid integer is required.')})
+
+    def get_cursor(self, request):
+        cursor = request.GET.get('cursor')
+        if not cursor:
+            return None
+        try:
+            return uuid.UUID(cursor)
+        except ValueError:
+            raise ValidationError({'cursor': _('Invalid cursor')})
+
+    async def get(self, request):
+        page_size = self.get_page_size(request)
+        queryset = Recipe.objects.filter(user=request.user).prefetch_related('ingredients', 'tags').order_by('id')
+        cursor = self.get_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(id__gt=cursor)
+
+        recipes = [recipe async for recipe in queryset[:page_size + 1]]
+        next_url = None
+        if len(recipes) > page_size:
+            recipes = recipes[:page_size]
+            params = request.GET.copy()
+            params['cursor'] = str(recipes[-1].id)
+            next_url = request.build_absolute_uri('?' + params.urlencode())
+
+        data = serializers.RecipeSerializer(recipes, many=True, context={'request': request}).data
+        return self.json({'next': next_url, 'results': data})
+
+    async def post(self, request):
+        serializer = serializers.RecipeSerializer(data=self.parse_body(request), context={'request': request})
+        return await self.save(serializer, status=201, user=request.user)
+
+
+class AsyncRecipeDetailView(AsyncAPIView):
+
+    async def get(self, request, pk):
+        queryset = Recipe.objects.filter(user=request.user).prefetch_related('ingredients', 'tags')
+        try:
+            recipe = await queryset.aget(pk=pk)
+        except Recipe.DoesNotExist:
+            raise NotFound()
+        return self.json(serializers.RecipeDetailSerializer(recipe, context={'request': request}).data)
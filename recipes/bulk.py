@@ -0,0 +1,40 @@
+from django.db import router
+
+from core.models import Recipe
+from recipes import caching, search, stats
+
+
+def bulk_insert(instances, relations=None, batch_size=1000):
+    """Insert instances with bulk_create and their M2M links with one insert per through table
+
+    relations holds, for each instance, a mapping of M2M field name to related primary keys.
+    bulk_create sends no model signals, so cached responses, the search index and the recipe
+    stats are brought up to date here instead. All instances go to the database of the first
+    one, which with sharding is the shard of its user.
+    """
+    if not instances:
+        return instances
+
+    ModelClass = type(instances[0])
+    using = router.db_for_write(ModelClass, instance=instances[0])
+    ModelClass._default_manager.using(using).bulk_create(instances, batch_size=batch_size)
+
+    for field in ModelClass._meta.many_to_many:
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        rows = [
+            through(**{source: instance.pk, target: pk})
+            for instance, related in zip(instances, relations or [])
+            for pk in dict.fromkeys(related.get(field.name, []))
+        ]
+        through._default_manager.using(using).bulk_create(rows, batch_size=batch_size)
+
+    if ModelClass is Recipe:
+        search.index_recipes([instance.pk for instance in instances], using=using)
+        stats.recipes_inserted(instances, relations, using)
+
+    for user_id in {instance.user_id for instance in instances}:
+        caching.invalidate(ModelClass, user_id, using=using)
+
+    return instances
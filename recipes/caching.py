@@ -0,0 +1,119 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from core import routers
+from core.models import Tag, Ingredient, Recipe
+from recipes.conditional import mark_changed, not_modified
+
+
+# Cached responses of each resource that a write to the model makes stale
+DEPENDENT_RESOURCES = {
+    Tag: ('tags', 'recipes'),
+    Ingredient: ('ingredients', 'recipes'),
+    Recipe: ('recipes',),
+}
+
+METRICS = ('hits', 'misses')
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def response_cache():
+    return caches[settings.RECIPES_CACHE_ALIAS]
+
+
+def version_key(user_id, resource):
+    return f'recipes:version:{resource}:{user_id}'
+
+
+def get_version(user_id, resource):
+    """Current version of a user's resource, seeded from the clock so an evicted counter never repeats"""
+    cache = response_cache()
+    key = version_key(user_id, resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id, *resources):
+    cache = response_cache()
+    for resource in resources:
+        key = version_key(user_id, resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(model, user_id, using=None):
+    """Make every cached response and Last-Modified depending on the user's rows of this model stale
+
+    The bump waits for the write transaction on using to commit. Bumping before that would let
+    a list request running in between cache the old rows under the new version. The user sticks
+    to the primary first, so list requests reading from a replica from then on skip the cache.
+    """
+    def changed():
+        routers.stick_to_primary(user_id)
+        bump_version(user_id, *DEPENDENT_RESOURCES[model])
+        mark_changed(user_id, *DEPENDENT_RESOURCES[model])
+
+    transaction.on_commit(changed, using=using)
+
+
+def record(metric):
+    cache = response_cache()
+    key = f'recipes:metrics:{metric}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def cache_metrics():
+    cache = response_cache()
+    values = cache.get_many([f'recipes:metrics:{metric}' for metric in METRICS])
+    metrics = {metric: values.get(f'recipes:metrics:{metric}', 0) for metric in METRICS}
+    lookups = metrics['hits'] + metrics['misses']
+    metrics['hit_ratio'] = metrics['hits'] / lookups if lookups else 0.0
+    return metrics
+
+
+class CachedListMixin:
+    """Serve list responses from a per-user cache keyed by the resource version"""
+    cache_resource = None
+
+    def list_cache_key(self, request):
+        version = get_version(request.user.pk, self.cache_resource)
+        url = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+        return f'recipes:list:{self.cache_resource}:{request.user.pk}:{version}:{url}'
+
+    def list(self, request, *args, **kwargs):
+        cache = response_cache()
+        key = self.list_cache_key(request)
+        cached = cache.get(key)
+
+        if cached is not None:
+            record('hits')
+            data, headers = cached
+            response = not_modified(request, headers) if 'ETag' in headers else None
+            if response is None:
+                response = Response(data, headers=headers)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = super().list(request, *args, **kwargs)
+        # A replica may not have the write behind the version yet, see invalidate
+        if response.status_code == 200 and not routers.replica_may_lag(request.user.pk):
+            headers = {name: response[name] for name in VALIDATOR_HEADERS if response.has_header(name)}
+            cache.set(key, (response.data, headers))
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,134 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_http_date
+
+from core.models import Tag, Ingredient, Recipe
+
+
+# Models whose rows show up in each resource's representation
+VALIDATOR_MODELS = {
+    'tags': (Tag,),
+    'ingredients': (Ingredient,),
+    'recipes': (Recipe, Tag, Ingredient),
+}
+
+
+def last_change_key(user_id, resource):
+    return f'recipes:changed:{resource}:{user_id}'
+
+
+def mark_changed(user_id, *resources):
+    """Move the user's last change time of each resource forward, by at least a second
+
+    Last-Modified has a resolution of one second, so a second write within the same second
+    still has to yield a later date than the one a client may already hold.
+    """
+    cache = caches[settings.RECIPES_CACHE_ALIAS]
+    now = int(time.time())
+    for resource in resources:
+        key = last_change_key(user_id, resource)
+        cache.set(key, max(now, (cache.get(key) or 0) + 1), timeout=None)
+
+
+def last_change(user_id, resource):
+    """Unix time of the user's last write to the resource, the current time when unknown
+
+    A lost entry thus makes clients refetch rather than keep a representation that changed.
+    """
+    cache = caches[settings.RECIPES_CACHE_ALIAS]
+    key = last_change_key(user_id, resource)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, int(time.time()), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def _per_user(model, aggregate):
+    rows = model.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    return Subquery(rows.annotate(value=aggregate).values('value'))
+
+
+def user_validators(user, resource):
+    """Row counts and latest updated_at of every model behind the resource, in a single query
+
+    When the models live on another database than the user, i.e. on the user's shard, the
+    subqueries cannot join users and each model is aggregated with a query of its own.
+    """
+    models = VALIDATOR_MODELS[resource]
+    if any(router.db_for_read(model) != router.db_for_read(get_user_model()) for model in models):
+        validators = {}
+        for model in models:
+            name = model._meta.model_name
+            values = model.objects.filter(user=user).aggregate(count=Count('pk'), latest=Max('updated_at'))
+            validators[f'{name}_count'] = values['count']
+            validators[f'{name}_latest'] = values['latest']
+        return validators
+
+    annotations = {}
+    for model in models:
+        name = model._meta.model_name
+        annotations[f'{name}_count'] = _per_user(model, Count('pk'))
+        annotations[f'{name}_latest'] = _per_user(model, Max('updated_at'))
+
+    return get_user_model().objects.filter(pk=user.pk).annotate(**annotations).values(*annotations).get()
+
+
+def conditional_headers(request, resource):
+    """ETag and Last-Modified for a GET of the resource, unique per URL and representation
+
+    Last-Modified is the time of the user's last write rather than the newest updated_at, which
+    would stay put or move back when the newest row is deleted.
+    """
+    validators = user_validators(request.user, resource)
+
+    seed = '|'.join([
+        request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *(f'{key}={value}' for key, value in sorted(validators.items())),
+    ])
+    return {
+        'ETag': quote_etag(hashlib.sha256(seed.encode()).hexdigest()),
+        'Last-Modified': http_date(last_change(request.user.pk, resource)),
+    }
+
+
+def not_modified(request, headers):
+    """Return a 304 response when the client's validators still match, else None"""
+    last_modified = headers.get('Last-Modified')
+    response = get_conditional_response(
+        request._request,
+        etag=headers['ETag'],
+        last_modified=int(parse_http_date(last_modified)) if last_modified else None,
+    )
+    if response is not None:
+        for name, value in headers.items():
+            response[name] = value
+    return response
+
+
+class ConditionalGetMixin:
+    """Answer unchanged GET requests with 304 Not Modified before any serialization"""
+    cache_resource = None
+
+    def conditional(self, request, handler, *args, **kwargs):
+        headers = conditional_headers(request, self.cache_resource)
+        response = not_modified(request, headers)
+        if response is not None:
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, super().list, *args, **kwargs)
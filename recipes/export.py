@@ -0,0 +1,49 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from recipes.serializers import RecipeSerializer
+
+
+def iter_chunks(queryset, chunk_size):
+    """Iterate a queryset in primary key order as lists of at most chunk_size, one query each"""
+    queryset = queryset.order_by('id')
+    last_id = None
+
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def iter_records(queryset, chunk_size):
+    # One serializer for the whole export, its fields and nested serializers are built once
+    serializer = RecipeSerializer(many=True, context={'expand': ('ingredients', 'tags')})
+    for chunk in iter_chunks(queryset, chunk_size):
+        for data in serializer.to_representation(chunk):
+            yield json.dumps(data, cls=JSONEncoder)
+
+
+def stream_json(queryset, chunk_size):
+    """Yield a JSON array piece by piece"""
+    yield '['
+    separator = ''
+    for record in iter_records(queryset, chunk_size):
+        yield separator + record
+        separator = ','
+    yield ']'
+
+
+def stream_ndjson(queryset, chunk_size):
+    """Yield one JSON document per line"""
+    for record in iter_records(queryset, chunk_size):
+        yield record + '\n'
+
+
+EXPORT_FORMATS = {
+    'json': (stream_json, 'application/json', 'recipes.json'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'recipes.ndjson'),
+}
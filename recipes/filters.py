@@ -0,0 +1,54 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Exists, OuterRef
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+
+
+MATCH_MODES = ('any', 'all')
+
+
+def filter_related(queryset, field_name, ids, match='any'):
+    """Limit recipes to those linked to any or all of the ids through the given M2M field
+
+    Both modes compile to a single query using a subquery on the through table, so no
+    join multiplies recipe rows and no DISTINCT is needed.
+    """
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+    links = through.objects.filter(**{f'{target}__in': ids})
+
+    if match == 'all':
+        matching = links.values(source).annotate(matched=Count(target)).filter(matched=len(ids))
+        return queryset.filter(pk__in=matching.values(source))
+
+    return queryset.filter(Exists(links.filter(**{source: OuterRef('pk')})))
+
+
+class RecipeRelationsFilter(BaseFilterBackend):
+    """Filter recipes with ?tags=<ids>&ingredients=<ids>, matching any (default) or all ids with ?match="""
+    fields = ('tags', 'ingredients')
+
+    def filter_queryset(self, request, queryset, view):
+        match = request.query_params.get('match', 'any')
+        if match not in MATCH_MODES:
+            raise ValidationError({'match': _('Choose one of: %s') % ', '.join(MATCH_MODES)})
+
+        for name in self.fields:
+            ids = self.parse_ids(request.query_params.get(name, ''), name)
+            if ids:
+                queryset = filter_related(queryset, name, ids, match)
+
+        return queryset
+
+    def parse_ids(self, value, name):
+        pk_field = Recipe._meta.get_field(name).related_model._meta.pk
+        try:
+            ids = [pk_field.to_python(item.strip()) for item in value.split(',') if item.strip()]
+        except DjangoValidationError:
+            raise ValidationError({name: _('Expected a comma separated list of ids')})
+        return list(dict.fromkeys(ids))
@@ -0,0 +1,63 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import bench, profiling
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Compare the DRF views served through WSGI with the async views served through ASGI under concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=100, help='Recipes per user')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario and stack')
+        parser.add_argument('--concurrency', type=int, default=32,
+                            help='Worker threads on the WSGI side, requests in flight on the ASGI side')
+
+    def handle(self, *args, **options):
+        with bench.scratch_database(), bench.allow_test_clients():
+            user_ids = bench.seed(options['users'], recipes=options['recipes'], stdout=self.stdout)
+            tokens = [Token.objects.create(user_id=user_id).key for user_id in user_ids]
+            recipes = {token: list(Recipe.objects.filter(user__auth_token__key=token).values_list('id', flat=True))
+                       for token in tokens}
+
+            scenarios = (
+                ('list', lambda token: reverse('recipes:recipes-list'),
+                 lambda token: reverse('recipes:async-recipe-list')),
+                ('detail', lambda token: reverse('recipes:recipes-detail', args=[random.choice(recipes[token])]),
+                 lambda token: reverse('recipes:async-recipe-detail', args=[random.choice(recipes[token])])),
+                ('me', lambda token: reverse('user:me'), lambda token: reverse('user:async_me')),
+            )
+            for name, sync_url, async_url in scenarios:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+                self.report('wsgi', *bench.measure_threaded(
+                    lambda: self.sync_request(tokens, sync_url), options['requests'], options['concurrency'],
+                ))
+                self.report('asgi', *bench.measure_async(
+                    lambda: self.async_request(tokens, async_url), options['requests'], options['concurrency'],
+                ))
+
+    def sync_request(self, tokens, url):
+        token = random.choice(tokens)
+        response = Client().get(url(token), headers=self.headers(token))
+        assert response.status_code == 200, response.status_code
+
+    async def async_request(self, tokens, url):
+        token = random.choice(tokens)
+        response = await AsyncClient().get(url(token), headers=self.headers(token))
+        assert response.status_code == 200, response.status_code
+
+    def headers(self, token):
+        return {'authorization': f'Token {token}'}
+
+    def report(self, stack, samples, elapsed):
+        stats = profiling.summarize(samples)
+        self.stdout.write(
+            f'{stack}: {len(samples) / elapsed:.0f} req/s p50={stats["p50_ms"]:.2f}ms '
+            f'p95={stats["p95_ms"]:.2f}ms p99={stats["p99_ms"]:.2f}ms'
+        )
@@ -0,0 +1,46 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from core import bench, profiling
+from core.models import Tag, Ingredient, Recipe
+from recipes.filters import filter_related
+
+
+class Command(BaseCommand):
+    help = 'Measure tag and ingredient filter latency while the M2M tables grow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', default='1000,10000,50000',
+                            help='Comma separated cumulative user counts to seed before each measurement')
+        parser.add_argument('--recipes', type=int, default=40, help='Recipes per user')
+        parser.add_argument('--fanout', type=int, default=5, help='Tags and ingredients per recipe')
+        parser.add_argument('--iterations', type=int, default=300)
+
+    def handle(self, *args, **options):
+        steps = [int(step) for step in options['steps'].split(',')]
+
+        with bench.scratch_database():
+            seeded = []
+            for users in steps:
+                seeded += bench.seed(
+                    users - len(seeded), recipes=options['recipes'], fanout=options['fanout'],
+                    start=len(seeded), stdout=self.stdout,
+                )
+                links = Recipe.tags.through.objects.count() + Recipe.ingredients.through.objects.count()
+                self.stdout.write(self.style.MIGRATE_HEADING(f'== {users} users, {links} M2M rows =='))
+                for match in ('any', 'all'):
+                    samples = bench.measure(lambda: self.run_filter(seeded, match), options['iterations'])
+                    stats = profiling.summarize(samples)
+                    self.stdout.write(f'match={match}: p50={stats["p50_ms"]:.3f}ms p99={stats["p99_ms"]:.3f}ms')
+
+    def run_filter(self, user_ids, match):
+        """Filter one random user's recipes by two tags and one ingredient, like the list endpoint"""
+        user_id = random.choice(user_ids)
+        tag_ids = list(Tag.objects.filter(user_id=user_id).values_list('id', flat=True)[:2])
+        ingredient_ids = list(Ingredient.objects.filter(user_id=user_id).values_list('id', flat=True)[:1])
+
+        queryset = Recipe.objects.filter(user_id=user_id).order_by('id')
+        queryset = filter_related(queryset, 'tags', tag_ids, match)
+        queryset = filter_related(queryset, 'ingredients', ingredient_ids, match)
+        return list(queryset[:100])
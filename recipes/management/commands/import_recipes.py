@@ -0,0 +1,148 @@
+import csv
+import itertools
+import json
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+
+from core import sharding
+from core.models import Tag, Ingredient, Recipe
+from recipes.bulk import bulk_insert
+
+
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+
+
+def read_csv(stream, separator):
+    """Yield line numbers and records of a CSV file whose tags and ingredients columns hold separated names"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        for key in ('tags', 'ingredients'):
+            value = row.get(key) or ''
+            row[key] = [name.strip() for name in value.split(separator) if name.strip()]
+        yield reader.line_num, row
+
+
+def read_ndjson(stream, separator):
+    """Yield line numbers and records of the non blank lines, or the error a line is skipped for"""
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, ValidationError(f'Invalid JSON: {exc.msg}')
+            continue
+        if not isinstance(record, dict):
+            yield number, ValidationError('Expected a JSON object')
+            continue
+        yield number, record
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+class NameMap:
+    """In-memory name to id map that upserts missing rows per batch"""
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = {}
+
+    def resolve(self, names):
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            existing = self.model.objects.filter(user=self.user, name__in=missing).values_list('name', 'id')
+            self.ids.update(existing)
+            created = [self.model(user=self.user, name=name) for name in missing if name not in self.ids]
+            bulk_insert(created)
+            self.ids.update((obj.name, obj.id) for obj in created)
+        return self.ids
+
+
+class Command(BaseCommand):
+    help = 'Import recipes for a user from a CSV or NDJSON file, streaming it in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for standard input')
+        parser.add_argument('--user', required=True, help='Email of the user owning the recipes')
+        parser.add_argument('--format', choices=READERS, help='Input format, guessed from the extension by default')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--separator', default='|', help='Separator of tag and ingredient names in CSV files')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        input_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'ndjson')
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options['path'], newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(f'Cannot read {options["path"]}: {exc.strerror}')
+
+        with stream, sharding.for_user(user):
+            records = READERS[input_format](stream, options['separator'])
+            imported, skipped, elapsed = self.import_records(user, records, options['batch_size'])
+
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes ({skipped} skipped) in {elapsed:.1f}s, {rate:,.0f} rows/s'
+        ))
+
+    def import_records(self, user, records, batch_size):
+        tags = NameMap(Tag, user)
+        ingredients = NameMap(Ingredient, user)
+        fields = {name: Recipe._meta.get_field(name) for name in RECIPE_FIELDS}
+        started = time.perf_counter()
+        imported = skipped = 0
+
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            rows = []
+            for number, record in batch:
+                try:
+                    if isinstance(record, ValidationError):
+                        raise record
+                    attrs = {name: field.clean(record.get(name, field.get_default()), None) for name, field in fields.items()}
+                except ValidationError as exc:
+                    self.stderr.write(f'Line {number} skipped: {"; ".join(exc.messages)}')
+                    skipped += 1
+                    continue
+                rows.append((attrs, record.get('tags') or [], record.get('ingredients') or []))
+
+            with transaction.atomic(using=router.db_for_write(Recipe)):
+                tag_ids = tags.resolve(name for _, names, _ in rows for name in names)
+                ingredient_ids = ingredients.resolve(name for _, _, names in rows for name in names)
+                instances = [Recipe(user=user, **attrs) for attrs, _, _ in rows]
+                relations = [
+                    {
+                        'tags': [tag_ids[name] for name in tag_names],
+                        'ingredients': [ingredient_ids[name] for name in ingredient_names],
+                    }
+                    for _, tag_names, ingredient_names in rows
+                ]
+                bulk_insert(instances, relations, batch_size=batch_size)
+
+            imported += len(instances)
+            if self.verbosity >= 2:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{imported} recipes, {imported / elapsed:,.0f} rows/s')
+
+        return imported, skipped, time.perf_counter() - started
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text recipe search index from the recipe tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Database alias to rebuild (default: where recipes are written)')
+
+    def handle(self, *args, **options):
+        count = search.rebuild(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} recipes'))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+
+from core import sharding
+from core.models import Recipe
+from recipes import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the recipe stats and tag and ingredient usage counts from the recipe tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='Database to repair, may be repeated (default: every shard, or where recipes '
+                                 'are written without sharding)')
+        parser.add_argument('--user', help='Only repair the rows of the user with this email')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift, exiting with an error when there is any')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        databases = options['databases'] or settings.DATABASE_SHARDS or [router.db_for_write(Recipe)]
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user with email {options["user"]}')
+            user_ids = [user.pk]
+            databases = options['databases'] or [sharding.shard_for_user(user.pk)]
+
+        total = 0
+        for using in databases:
+            with transaction.atomic(using=using):
+                drift = stats.repair(using, user_ids=user_ids, dry_run=options['check'])
+            for name, count in drift.items():
+                self.stdout.write(f'{using}: {count} {name} rows drifted')
+            total += sum(drift.values())
+
+        if options['check'] and total:
+            raise CommandError(f'{total} summary rows do not match the recipe tables')
+        verb = 'found' if options['check'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'{total} rows {verb}'))
@@ -0,0 +1,8 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeAttrsCursorPagination(CursorPagination):
+    """Keyset pagination over the primary key so deep pages stay as cheap as the first one"""
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
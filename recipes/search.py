@@ -0,0 +1,162 @@
+"""Full-text recipe search over titles and ingredient names
+
+The index lives in the core_recipe_search table created by the core migrations: an FTS5
+virtual table on SQLite and a tsvector column with a GIN index on PostgreSQL. It is kept
+in sync by the signal handlers in recipes.signals and by recipes.bulk.
+"""
+import re
+
+from django.db import connections, router
+
+from core.models import Recipe
+
+
+TABLE = 'core_recipe_search'
+CHUNK_SIZE = 500
+
+
+def terms(query):
+    """Lowercase word tokens of a user query, safe to embed in either backend's query syntax"""
+    return re.findall(r'\w+', query.lower())
+
+
+class SQLiteBackend:
+    """FTS5 table with the ids stored as indexed tokens so lookups by id and user hit the index"""
+
+    def delete(self, cursor, ids):
+        ids = list(ids)
+        for first in range(0, len(ids), CHUNK_SIZE):
+            match = 'recipe_id:({})'.format(' OR '.join(f'"{pk.hex}"' for pk in ids[first:first + CHUNK_SIZE]))
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN (SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)',
+                [match],
+            )
+
+    def insert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (recipe_id, user_id, title, ingredients) VALUES (%s, %s, %s, %s)',
+            [(recipe_id.hex, user_id.hex, title, ingredients) for recipe_id, user_id, title, ingredients in rows],
+        )
+
+    def search(self, cursor, user_id, words, limit):
+        match = 'user_id:"{}" AND {{title ingredients}}: ({})'.format(
+            user_id.hex, ' AND '.join(f'"{word}"*' for word in words)
+        )
+        cursor.execute(
+            f'SELECT recipe_id FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY bm25({TABLE}, 0, 0, 10.0, 1.0) LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgreSQLBackend:
+    """tsvector document per recipe, title weighted above ingredients, ranked with ts_rank"""
+
+    def delete(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE recipe_id = ANY(%s)', [list(ids)])
+
+    def insert(self, cursor, rows):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (recipe_id, user_id, document) VALUES (%s, %s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))",
+            rows,
+        )
+
+    def search(self, cursor, user_id, words, limit):
+        query = ' & '.join(f'{word}:*' for word in words)
+        cursor.execute(
+            f"SELECT recipe_id FROM {TABLE}, to_tsquery('simple', %s) query "
+            f"WHERE user_id = %s AND document @@ query ORDER BY ts_rank(document, query) DESC LIMIT %s",
+            [query, user_id, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend(),
+    'postgresql': PostgreSQLBackend(),
+}
+
+
+def get_connection(using=None):
+    return connections[using or router.db_for_write(Recipe)]
+
+
+def index_recipes(ids, using=None, replace=True):
+    """Rebuild the index rows of the given recipes, dropping those that no longer exist
+
+    replace=False skips deleting the old rows, for recipes known to have none.
+    """
+    connection = get_connection(using)
+    backend = BACKENDS.get(connection.vendor)
+    ids = [Recipe._meta.pk.to_python(pk) for pk in ids]
+    if backend is None or not ids:
+        return
+
+    for first in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[first:first + CHUNK_SIZE]
+        recipes = Recipe.objects.using(connection.alias).filter(pk__in=chunk).values_list('id', 'user_id', 'title')
+        names = {}
+        links = Recipe.ingredients.through.objects.using(connection.alias).filter(recipe_id__in=chunk)
+        for recipe_id, name in links.values_list('recipe_id', 'ingredient__name'):
+            names.setdefault(recipe_id, []).append(name)
+
+        rows = [(pk, user_id, title, ' '.join(names.get(pk, []))) for pk, user_id, title in recipes]
+        with connection.cursor() as cursor:
+            if replace:
+                backend.delete(cursor, chunk)
+            backend.insert(cursor, rows)
+
+
+def add_recipe(recipe, using=None):
+    """Index a recipe that was just created and has no ingredients yet"""
+    connection = get_connection(using)
+    backend = BACKENDS.get(connection.vendor)
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.insert(cursor, [(recipe.pk, recipe.user_id, recipe.title, '')])
+
+
+def remove_recipes(ids, using=None):
+    connection = get_connection(using)
+    backend = BACKENDS.get(connection.vendor)
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.delete(cursor, [Recipe._meta.pk.to_python(pk) for pk in ids])
+
+
+def rebuild(using=None):
+    """Reindex every recipe, for instance after loading data with signals disabled"""
+    connection = get_connection(using)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    ids = Recipe.objects.using(connection.alias).order_by('id').values_list('id', flat=True)
+    count = 0
+    last_id = None
+    while True:
+        chunk = list((ids if last_id is None else ids.filter(id__gt=last_id))[:CHUNK_SIZE])
+        if not chunk:
+            return count
+        index_recipes(chunk, using=connection.alias, replace=False)
+        count += len(chunk)
+        last_id = chunk[-1]
+
+
+def search(user, query, limit=20, using=None):
+    """Ids of the user's recipes matching every word of the query, best match first"""
+    words = terms(query)
+    if not words:
+        return []
+
+    connection = get_connection(using)
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        queryset = Recipe.objects.using(connection.alias).filter(user=user)
+        for word in words:
+            queryset = queryset.filter(title__icontains=word)
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        ids = backend.search(cursor, user.pk, words, limit)
+    return [Recipe._meta.pk.to_python(pk) for pk in ids]
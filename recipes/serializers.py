@@ -1,36 +1,101 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core import profiling
+from core.models import Tag, Ingredient, Recipe, RecipeStats, TagUsage, IngredientUsage
+from recipes.bulk import bulk_insert
+from recipes.fields import UserPrimaryKeyRelatedField
 
 
-class TagSerializer(serializers.ModelSerializer):
+class ProfiledRepresentationMixin:
+    """Count rendering towards the serialize phase of the request profile"""
+
+    def to_representation(self, instance):
+        with profiling.phase('serialize'):
+            return super().to_representation(instance)
+
+
+class BulkCreateListSerializer(ProfiledRepresentationMixin, serializers.ListSerializer):
+    """Insert a validated batch with bulk_create and one insert per M2M through table"""
+    batch_size = 1000
+
+    def create(self, validated_data):
+        ModelClass = self.child.Meta.model
+        m2m_fields = ModelClass._meta.many_to_many
+        instances = []
+        relations = []
+
+        for attrs in validated_data:
+            related = {field.name: [obj.pk for obj in attrs.pop(field.name)] for field in m2m_fields if field.name in attrs}
+            instances.append(ModelClass(**attrs))
+            relations.append(related)
+
+        bulk_insert(instances, relations, batch_size=self.batch_size)
+
+        if m2m_fields:
+            prefetch_related_objects(instances, *(field.name for field in m2m_fields))
+
+        return instances
+
+
+class SparseFieldsMixin:
+    """Drop every field missing from the 'fields' context entry, when one is given"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ExpandFieldsMixin:
+    """Replace relations named in the 'expand' context entry with their nested representation"""
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.context.get('expand') or ():
+            if name in self.fields:
+                self.fields[name] = self.expandable_fields[name](many=True, read_only=True)
+
+
+class TagSerializer(ProfiledRepresentationMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Tag
         exclude = ['user']
+        list_serializer_class = BulkCreateListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(ProfiledRepresentationMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
         exclude = ['user']
+        list_serializer_class = BulkCreateListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = serializers.PrimaryKeyRelatedField(
+class RecipeSerializer(ProfiledRepresentationMixin, SparseFieldsMixin, ExpandFieldsMixin, serializers.ModelSerializer):
+    ingredients = UserPrimaryKeyRelatedField(
         many = True,
         queryset = Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many = True,
         queryset = Tag.objects.all()
     )
 
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+
     class Meta:
         model = Recipe
         exclude = ('user',)
+        list_serializer_class = BulkCreateListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -43,3 +108,33 @@ class RecipeDetailSerializer(RecipeSerializer):
         many = True,
         read_only = True
     )
+
+
+class TagUsageSerializer(serializers.ModelSerializer):
+    id = serializers.UUIDField(source='tag_id')
+    name = serializers.CharField(source='tag.name')
+
+    class Meta:
+        model = TagUsage
+        fields = ('id', 'name', 'recipe_count')
+
+
+class IngredientUsageSerializer(serializers.ModelSerializer):
+    id = serializers.UUIDField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient.name')
+
+    class Meta:
+        model = IngredientUsage
+        fields = ('id', 'name', 'recipe_count')
+
+
+class RecipeStatsSerializer(serializers.ModelSerializer):
+    """Recipe count and averages of a user, with their most used tags and ingredients"""
+    average_price = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+    average_time_minutes = serializers.FloatField(read_only=True)
+    tags = TagUsageSerializer(many=True, read_only=True)
+    ingredients = IngredientUsageSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = RecipeStats
+        fields = ('recipe_count', 'average_price', 'average_time_minutes', 'tags', 'ingredients')
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import STATS_FIELDS, User, Tag, Ingredient, Recipe, RecipeStats
+from recipes import caching, search, stats
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_cached_lists(sender, instance, using, **kwargs):
+    caching.invalidate(sender, instance.user_id, using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def relations_changed(sender, instance, action, using, **kwargs):
+    """Link changes leave the recipe row untouched, so bump updated_at and the cache version here
+
+    For reverse changes (tag.recipe_set.add) the tag or ingredient is touched instead,
+    which the recipe validators cover as well.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        instance.updated_at = timezone.now()
+        type(instance).objects.using(using).filter(pk=instance.pk).update(updated_at=instance.updated_at)
+        caching.invalidate(Recipe, instance.user_id, using=using)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, created, using, **kwargs):
+    if created:
+        search.add_recipe(instance, using=using)
+    else:
+        search.index_recipes([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, using, **kwargs):
+    search.remove_recipes([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def reindex_recipe_ingredients(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Recipes are indexed with their ingredient names, so keep them in step with the links"""
+    if action == 'pre_clear' and reverse:
+        instance._search_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            search.index_recipes([instance.pk], using=using)
+        elif action == 'post_clear':
+            search.index_recipes(instance.__dict__.pop('_search_recipe_ids', []), using=using)
+        else:
+            search.index_recipes(pk_set, using=using)
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_renamed_ingredient(sender, instance, created, using, **kwargs):
+    if not created:
+        search.index_recipes(instance.recipe_set.values_list('pk', flat=True), using=using)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def collect_ingredient_recipes(sender, instance, **kwargs):
+    instance._search_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def reindex_ingredient_recipes(sender, instance, using, **kwargs):
+    search.index_recipes(instance.__dict__.pop('_search_recipe_ids', []), using=using)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_data(sender, instance, **kwargs):
+    """Deletes do not cascade across databases, so remove the user's rows from the shards"""
+    for shard in settings.DATABASE_SHARDS:
+        for model in (Recipe, Tag, Ingredient, RecipeStats):
+            model.objects.using(shard).filter(user_id=instance.pk).delete()
+
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_recipe(sender, instance, created, using, update_fields, **kwargs):
+    """Add a new recipe to its user's stats, or the change of price and time of an edited one"""
+    loaded = instance.__dict__.setdefault('_loaded_values', {})
+    price, minutes = stats.totals(instance)
+    if created:
+        stats.adjust_recipes(instance.user_id, 1, price, minutes, using)
+    elif update_fields is None or set(STATS_FIELDS) & set(update_fields):
+        if not all(name in loaded for name in STATS_FIELDS):
+            # Deferred when loaded, so the previous values are unknown
+            stats.repair(using, user_ids=[instance.user_id])
+        else:
+            old_price, old_minutes = stats.totals(Recipe(**{name: loaded[name] for name in STATS_FIELDS}))
+            stats.adjust_recipes(instance.user_id, 0, price - old_price, minutes - old_minutes, using)
+    loaded.update(price=price, time_minutes=minutes)
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_recipe_relations(sender, instance, using, **kwargs):
+    """Links are deleted by the cascade without m2m_changed, so remember them for the usage counts"""
+    instance._stats_relations = {
+        Tag: list(instance.tags.through.objects.using(using).filter(recipe_id=instance.pk)
+                  .values_list('tag_id', flat=True)),
+        Ingredient: list(instance.ingredients.through.objects.using(using).filter(recipe_id=instance.pk)
+                         .values_list('ingredient_id', flat=True)),
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, using, **kwargs):
+    price, minutes = stats.totals(instance)
+    stats.adjust_recipes(instance.user_id, -1, -price, -minutes, using)
+    for model, pks in instance.__dict__.pop('_stats_relations', {}).items():
+        stats.adjust_usage(model, dict.fromkeys(pks, -1), using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relations(sender, instance, action, reverse, model, pk_set, using, **kwargs):
+    """Keep the usage counts of tags and ingredients in step with the links
+
+    Removed and cleared links are counted before the delete, since remove() reports every
+    given id whether it was linked or not.
+    """
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    source, target = ('recipe_id', f'{model._meta.model_name}_id') if not reverse else \
+        (f'{type(instance)._meta.model_name}_id', 'recipe_id')
+    links = sender.objects.using(using).filter(**{source: instance.pk})
+    if action == 'pre_remove':
+        pks = list(links.filter(**{f'{target}__in': pk_set}).values_list(target, flat=True))
+    elif action == 'pre_clear':
+        pks = list(links.values_list(target, flat=True))
+    else:
+        pks = pk_set
+
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        stats.adjust_usage(type(instance), {instance.pk: sign * len(pks)}, using)
+    else:
+        stats.adjust_usage(model, dict.fromkeys(pks, sign), using)
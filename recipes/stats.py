@@ -0,0 +1,130 @@
+"""Per-user recipe aggregates and per-tag and per-ingredient usage counts
+
+The summary tables in core.models are updated with F() expressions as recipes and their links
+change, so the stats endpoint reads a handful of rows instead of aggregating the recipe tables.
+Usage rows are created on first use. The signal handlers in recipes.signals and recipes.bulk
+keep them current; writes that bypass both (raw SQL, queryset updates, bench seeding) leave
+drift behind that repair, run by the repair_recipe_stats command, recomputes.
+"""
+from django.db.models import Count, F, Sum
+
+from core.models import Tag, Ingredient, Recipe, RecipeStats, TagUsage, IngredientUsage
+
+
+USAGE_MODELS = {
+    Tag: TagUsage,
+    Ingredient: IngredientUsage,
+}
+
+
+def totals(recipe):
+    """Price and time of a recipe as stored, whatever type they were assigned with"""
+    return (Recipe._meta.get_field('price').to_python(recipe.price),
+            Recipe._meta.get_field('time_minutes').to_python(recipe.time_minutes))
+
+
+def adjust_recipes(user_id, count, price, minutes, using):
+    """Add to the user's recipe count and totals, creating the stats row on first use"""
+    if not (count or price or minutes):
+        return
+    updates = {
+        'recipe_count': F('recipe_count') + count,
+        'price_total': F('price_total') + price,
+        'time_minutes_total': F('time_minutes_total') + minutes,
+    }
+    queryset = RecipeStats.objects.using(using).filter(user_id=user_id)
+    if not queryset.update(**updates):
+        RecipeStats.objects.using(using).bulk_create([RecipeStats(user_id=user_id)], ignore_conflicts=True)
+        queryset.update(**updates)
+
+
+def adjust_usage(model, deltas, using):
+    """Add each delta to the recipe count of the tag or ingredient with that primary key"""
+    Usage = USAGE_MODELS[model]
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, set()).add(pk)
+
+    for delta, pks in by_delta.items():
+        queryset = Usage.objects.using(using)
+        if queryset.filter(pk__in=pks).update(recipe_count=F('recipe_count') + delta) == len(pks):
+            continue
+        missing = dict(model.objects.using(using).filter(pk__in=pks, usage__isnull=True).values_list('pk', 'user_id'))
+        queryset.bulk_create([Usage(pk=pk, user_id=user_id) for pk, user_id in missing.items()], ignore_conflicts=True)
+        queryset.filter(pk__in=missing).update(recipe_count=F('recipe_count') + delta)
+
+
+def recipes_inserted(instances, relations, using):
+    """Count recipes inserted by recipes.bulk.bulk_insert, which sends no signals"""
+    per_user = {}
+    for recipe in instances:
+        count, price, minutes = per_user.get(recipe.user_id, (0, 0, 0))
+        recipe_price, recipe_minutes = totals(recipe)
+        per_user[recipe.user_id] = (count + 1, price + recipe_price, minutes + recipe_minutes)
+    for user_id, (count, price, minutes) in per_user.items():
+        adjust_recipes(user_id, count, price, minutes, using)
+
+    for model, name in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+        deltas = {}
+        for related in relations or []:
+            for pk in dict.fromkeys(related.get(name, [])):
+                deltas[pk] = deltas.get(pk, 0) + 1
+        adjust_usage(model, deltas, using)
+
+
+def _sync(model, existing, expected, fields, dry_run, using):
+    """Make the summary rows match the expected values, returning how many were wrong"""
+    stale = []
+    for row in existing:
+        values = expected.pop(row.pk, dict.fromkeys(fields, 0))
+        if any(getattr(row, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(row, name, value)
+            stale.append(row)
+    missing = [model(pk=pk, **values) for pk, values in expected.items()]
+
+    if not dry_run:
+        model.objects.using(using).bulk_update(stale, fields, batch_size=1000)
+        model.objects.using(using).bulk_create(missing, batch_size=1000)
+    return len(stale) + len(missing)
+
+
+def repair(using, user_ids=None, dry_run=False):
+    """Recompute the summary rows of a database, or of some users on it, from the recipe tables
+
+    Returns the number of rows that had drifted, per summary model name.
+    """
+    def scoped(queryset):
+        return queryset if user_ids is None else queryset.filter(user_id__in=user_ids)
+
+    per_user = scoped(Recipe.objects.using(using).order_by()).values('user_id').annotate(
+        count=Count('id'), price=Sum('price'), minutes=Sum('time_minutes'),
+    )
+    expected = {
+        row['user_id']: {'recipe_count': row['count'], 'price_total': row['price'],
+                         'time_minutes_total': row['minutes']}
+        for row in per_user
+    }
+    drift = {
+        RecipeStats._meta.model_name: _sync(
+            RecipeStats, scoped(RecipeStats.objects.using(using)), expected,
+            ['recipe_count', 'price_total', 'time_minutes_total'], dry_run, using,
+        ),
+    }
+
+    for model, Usage in USAGE_MODELS.items():
+        counts = scoped(model.objects.using(using)).annotate(uses=Count('recipe')).values_list('pk', 'user_id', 'uses')
+        owners = {}
+        expected = {}
+        for pk, user_id, uses in counts:
+            owners[pk] = user_id
+            if uses:
+                expected[pk] = {'recipe_count': uses}
+        existing = scoped(Usage.objects.using(using))
+        # New usage rows need their owner as well as the count
+        drift[Usage._meta.model_name] = _sync(
+            Usage, existing, {pk: {**values, 'user_id': owners[pk]} for pk, values in expected.items()},
+            ['recipe_count'], dry_run, using,
+        )
+    return drift
@@ -0,0 +1,72 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe
+
+
+ASYNC_RECIPES_URL = reverse('recipes:async-recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipes:async-recipe-detail', args=[recipe_id])
+
+
+class AsyncRecipeApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpassword')
+        token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.headers = {'authorization': f'Token {token.key}'}
+
+    async def test_auth_required(self):
+        """Test requests without a token are rejected"""
+        response = await AsyncClient().get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_list_pages_through_user_recipes(self):
+        """Test the list follows the cursor and skips other users' recipes"""
+        user2 = await sync_to_async(get_user_model().objects.create_user)('test2@gmail.com', 'testpassword')
+        await Recipe.objects.acreate(user=user2, title='Other', time_minutes=5, price=1)
+        for i in range(3):
+            await Recipe.objects.acreate(user=self.user, title=f'Recipe {i}', time_minutes=5, price=1)
+
+        first = await self.client.get(ASYNC_RECIPES_URL, {'page_size': 2}, headers=self.headers)
+        second = await self.client.get(first.json()['next'], headers=self.headers)
+
+        titles = [item['title'] for item in first.json()['results'] + second.json()['results']]
+        self.assertEqual(sorted(titles), ['Recipe 0', 'Recipe 1', 'Recipe 2'])
+        self.assertIsNone(second.json()['next'])
+
+    async def test_create_and_retrieve_recipe(self):
+        """Test a recipe created through the async view can be read back in detail"""
+        ingredient = await Ingredient.objects.acreate(user=self.user, name='Salt')
+        payload = {'title': 'Soup', 'time_minutes': 20, 'price': '3.50', 'ingredients': [str(ingredient.id)], 'tags': []}
+
+        response = await self.client.post(ASYNC_RECIPES_URL, payload, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = await self.client.get(detail_url(response.json()['id']), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['ingredients'], [str(ingredient.id)])
+
+    async def test_create_rejects_invalid_payload(self):
+        """Test validation errors come back as 400 with the field errors"""
+        response = await self.client.post(ASYNC_RECIPES_URL, {'title': ''}, content_type='application/json', headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.json())
+
+    async def test_retrieve_other_users_recipe_not_found(self):
+        """Test another user's recipe is reported as missing"""
+        user2 = await sync_to_async(get_user_model().objects.create_user)('test2@gmail.com', 'testpassword')
+        recipe = await Recipe.objects.acreate(user=user2, title='Other', time_minutes=5, price=1)
+
+        response = await self.client.get(detail_url(recipe.id), headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+from core.routers import stick_to_primary
+from recipes.caching import response_cache
+
+
+TAGS_URL = reverse('recipes:tags-list')
+RECIPES_URL = reverse('recipes:recipes-list')
+METRICS_URL = reverse('recipes:cache-metrics')
+
+
+class ListResponseCacheTests(TestCase):
+
+    def setUp(self):
+        response_cache().clear()
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpassword')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_cached_list_served_without_queries(self):
+        """Test a repeated list request is answered from the cache"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_write_invalidates_cached_list(self):
+        """Test creating a tag makes the cached tag list stale"""
+        self.client.get(TAGS_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TAGS_URL, {'name': 'Quick'})
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_m2m_change_invalidates_cached_recipes(self):
+        """Test linking a tag to a recipe makes the cached recipe list stale"""
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(tag)
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['tags'], [tag.id])
+
+    def test_bulk_create_invalidates_cached_list(self):
+        """Test bulk inserts, which send no model signals, still invalidate the cache"""
+        self.client.get(TAGS_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(TAGS_URL, [{'name': 'Quick'}, {'name': 'Vegan'}], format='json')
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_version_bumped_on_commit(self):
+        """Test a list cached while a write is uncommitted goes stale once the write commits"""
+        self.client.get(TAGS_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name='Vegan')
+            # Stands in for a request on another connection that still sees the old rows
+            stale = self.client.get(TAGS_URL)
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(stale['X-Cache'], 'HIT')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([tag['name'] for tag in response.data['results']], ['Vegan'])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_replica_read_during_write_not_cached(self):
+        """Test a list read from a replica while the user's write commits is not cached"""
+        def write_commits(execute, sql, params, many, context):
+            # Stands in for the write committing in another process once the replica was chosen
+            if 'core_tag' in sql:
+                stick_to_primary(self.user.pk)
+            return execute(sql, params, many, context)
+
+        # The primary plays the replica
+        with mock.patch('core.routers.random.choice', return_value='default'):
+            with connection.execute_wrapper(write_commits):
+                self.client.get(TAGS_URL)
+            second = self.client.get(TAGS_URL)
+            third = self.client.get(TAGS_URL)
+
+        self.assertEqual(second['X-Cache'], 'MISS')
+        self.assertEqual(third['X-Cache'], 'HIT')
+
+    def test_cache_metrics_for_staff(self):
+        """Test hit and miss counters are exposed to staff users only"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import parse_http_date
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+from recipes.caching import response_cache
+
+
+TAGS_URL = reverse('recipes:tags-list')
+RECIPES_URL = reverse('recipes:recipes-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipes:recipes-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        response_cache().clear()
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpassword')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_list_not_modified_with_etag(self):
+        """Test a matching If-None-Match gets 304 without a body"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        response = self.client.get(TAGS_URL)
+        etag = response['ETag']
+
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_not_modified_skips_serialization_on_cache_miss(self):
+        """Test validators alone decide the 304 when nothing is cached"""
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        response_cache().clear()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_not_modified_since(self):
+        """Test If-Modified-Since with the returned Last-Modified gets 304"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        last_modified = self.client.get(TAGS_URL)['Last-Modified']
+
+        response = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_modified_since_after_deleting_newest(self):
+        """Test deleting the newest recipe moves Last-Modified forward, even within the same second"""
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5)
+        newest = Recipe.objects.create(user=self.user, title='Cake', time_minutes=10, price=5)
+        last_modified = self.client.get(RECIPES_URL)['Last-Modified']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(newest.id))
+
+        response = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+        self.assertEqual([recipe['title'] for recipe in response.data['results']], ['Soup'])
+
+    def test_etag_changes_after_write(self):
+        """Test creating a tag changes the list validators"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name='Vegan')
+
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_recipe_etag_changes_after_tag_link(self):
+        """Test linking a tag to a recipe changes the recipe detail validators"""
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price=5)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        recipe.tags.add(tag)
+
+        response = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'], [tag.id])
@@ -0,0 +1,77 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpassword')
+
+    def write_file(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        self.addCleanup(file.close)
+        file.write(content)
+        file.flush()
+        return file.name
+
+    def test_import_csv(self):
+        """Test CSV rows are imported with tags and ingredients deduplicated by name"""
+        path = self.write_file('.csv', (
+            'title,time_minutes,price,tags,ingredients\n'
+            'Pancakes,15,4.50,Breakfast|Sweet,Flour|Milk\n'
+            'Omelette,10,3.00,Breakfast,Eggs|Milk\n'
+        ))
+        Tag.objects.create(user=self.user, name='Breakfast')
+        out = StringIO()
+
+        call_command('import_recipes', path, user=self.user.email, batch_size=1, stdout=out)
+
+        self.assertIn('Imported 2 recipes', out.getvalue())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 3)
+        pancakes = Recipe.objects.get(user=self.user, title='Pancakes')
+        self.assertEqual(sorted(tag.name for tag in pancakes.tags.all()), ['Breakfast', 'Sweet'])
+        self.assertEqual(sorted(i.name for i in pancakes.ingredients.all()), ['Flour', 'Milk'])
+
+    def test_import_ndjson_skips_invalid_records(self):
+        """Test invalid NDJSON records are reported and skipped"""
+        records = [
+            {'title': 'Soup', 'time_minutes': 30, 'price': '6.00', 'ingredients': ['Water']},
+            {'title': 'Broken', 'time_minutes': 'later', 'price': '1.00'},
+        ]
+        path = self.write_file('.ndjson', '\n'.join(json.dumps(record) for record in records))
+        out, err = StringIO(), StringIO()
+
+        call_command('import_recipes', path, user=self.user.email, stdout=out, stderr=err)
+
+        self.assertIn('Imported 1 recipes (1 skipped)', out.getvalue())
+        self.assertIn('Line 2 skipped', err.getvalue())
+        self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Soup'])
+
+    def test_import_ndjson_skips_malformed_lines(self):
+        """Test lines that are not JSON objects are reported by line number and skipped"""
+        path = self.write_file('.ndjson', (
+            '{"title": "Soup", "time_minutes": 30, "price": "6.00"}\n'
+            '\n'
+            '{"title": "Broken\n'
+            '["Stew", 20, "5.00"]\n'
+        ))
+        out, err = StringIO(), StringIO()
+
+        call_command('import_recipes', path, user=self.user.email, stdout=out, stderr=err)
+
+        self.assertIn('Imported 1 recipes (2 skipped)', out.getvalue())
+        self.assertIn('Line 3 skipped: Invalid JSON', err.getvalue())
+        self.assertIn('Line 4 skipped: Expected a JSON object', err.getvalue())
+
+    def test_missing_file(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot read /nonexistent/recipes.csv'):
+            call_command('import_recipes', '/nonexistent/recipes.csv', user=self.user.email)
@@ -35,11 +35,11 @@ class PrivateIngredientAPITests(TestCase):
         Ingredient.objects.create(user=self.user, name="Vinegar")
 
         response = self.client.get(INGREDIENTS_URL)
-        ingredients = Ingredient.objects.all()
+        ingredients = Ingredient.objects.order_by('id')
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_retrieve_limited_to_user(self):
         """Test return only the ingredients from the authenticated user"""
@@ -51,8 +51,8 @@ class PrivateIngredientAPITests(TestCase):
         response = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], ingredient_user_1.name)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], ingredient_user_1.name)
     
     def test_create_ingredient_successful(self):
         """Test to create new ingredient"""
@@ -66,4 +66,15 @@ class PrivateIngredientAPITests(TestCase):
         payload = {'name': ''}
         response = self.client.post(INGREDIENTS_URL, payload)
 
-        self.assertTrue(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertTrue(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_ingredients(self):
+        """Test a batch of ingredients is inserted with a single query"""
+        payload = [{'name': f'Ingredient {i}'} for i in range(100)]
+
+        with self.assertNumQueries(3):
+            response = self.client.post(INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 100)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 100)
@@ -1,14 +1,21 @@
+import json
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
-from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipes.serializers import RecipeSerializer, RecipeDetailSerializer, TagSerializer, IngredientSerializer
+from recipes.views import RecipeViewSet
 
 
 RECIPES_URL = reverse('recipes:recipes-list')
+EXPORT_URL = reverse('recipes:recipes-export')
 
 def sample_tag(user, name="spicy"):
     """Creates example tag"""
@@ -44,11 +51,11 @@ class PublicRecipeApiTests(TestCase):
 
         response = self.client.get(RECIPES_URL)
 
-        recipes = Recipe.objects.all()
+        recipes = Recipe.objects.order_by('id')
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         user2 = get_user_model().objects.create_user('test2@gmail.com', 'testpassword')
@@ -57,12 +64,12 @@ class PublicRecipeApiTests(TestCase):
         sample_recipe(user=user2)
 
         response = self.client.get(RECIPES_URL)
-        recipes = Recipe.objects.filter(user=self.user)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         recipe = sample_recipe(user=self.user)
@@ -108,8 +115,224 @@ class PublicRecipeApiTests(TestCase):
         self.assertIn(tag1, tags)
         self.assertIn(tag2, tags)
 
-        
-        
+    def test_list_recipes_constant_queries(self):
+        """Test listing recipes does not issue queries per recipe"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Recipe {i}', time_minutes=10, price=5.00)
+            for i in range(500)
+        ])
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id) for recipe in recipes
+        ])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredient.id) for recipe in recipes
+        ])
 
-    
+        with self.assertNumQueries(4):
+            response = self.client.get(RECIPES_URL, {'page_size': 500})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 500)
+
+    def test_bulk_create_recipes(self):
+        """Test a list payload creates every recipe with its relations"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': 10, 'price': '5.00',
+             'tags': [tag.id], 'ingredients': [ingredient.id]}
+            for i in range(3)
+        ]
+        response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in response.data], [item['title'] for item in payload])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_recipes_invalid_item(self):
+        """Test one invalid item rejects the whole batch with per item errors"""
+        payload = [
+            {'title': 'Valid', 'time_minutes': 10, 'price': '5.00', 'tags': [], 'ingredients': []},
+            {'title': '', 'time_minutes': 10, 'price': '5.00', 'tags': [], 'ingredients': []},
+        ]
+        response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_related_ids_constant_queries(self):
+        """Test submitted ingredient ids are resolved together instead of one by one"""
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name=f'Ingredient {i}') for i in range(51)
+        ])
+
+        def create(ingredient_ids):
+            payload = {'title': 'Test recipe', 'time_minutes': 30, 'price': '10.00',
+                       'tags': [], 'ingredients': ingredient_ids}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return response, len(queries)
+
+        # The user's first recipe also creates their stats row
+        create([])
+        _, one = create([ingredients[0].id])
+        response, fifty = create([ingredient.id for ingredient in ingredients[1:]])
+
+        self.assertEqual(fifty, one)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 50)
+
+    def test_create_recipe_with_foreign_ids(self):
+        """Test ids owned by another user are all reported as missing"""
+        user2 = get_user_model().objects.create_user('test2@gmail.com', 'testpassword')
+        foreign = [sample_ingredient(user=user2, name=f'Foreign {i}') for i in range(2)]
+        own = sample_ingredient(user=self.user)
+        payload = {
+            'title': 'Test recipe',
+            'time_minutes': 30,
+            'price': '10.00',
+            'tags': [],
+            'ingredients': [own.id] + [ingredient.id for ingredient in foreign],
+        }
+        response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['ingredients']), 2)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_export_recipes_json(self):
+        """Test the export streams every recipe with nested tags and ingredients"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+        sample_recipe(user=self.user, title='Second')
+        sample_recipe(user=get_user_model().objects.create_user('test2@gmail.com', 'testpassword'))
+
+        response = self.client.get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), 2)
+        exported = next(item for item in data if item['id'] == str(recipe.id))
+        self.assertEqual(exported['tags'][0]['name'], 'spicy')
+        self.assertEqual(exported['ingredients'][0]['name'], 'Cinnamon')
+
+    def test_export_recipes_ndjson_in_chunks(self):
+        """Test NDJSON export emits one line per recipe across several chunks"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        with mock.patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            response = self.client.get(EXPORT_URL, {'type': 'ndjson'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(sorted(json.loads(line)['title'] for line in lines), [f'Recipe {i}' for i in range(5)])
+
+    def test_filter_recipes_by_tags(self):
+        """Test recipes linked to any of the given tags are returned once"""
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Quick')
+        recipe1 = sample_recipe(user=self.user, title='Salad')
+        recipe1.tags.add(tag1, tag2)
+        recipe2 = sample_recipe(user=self.user, title='Toast')
+        recipe2.tags.add(tag2)
+        sample_recipe(user=self.user, title='Steak')
+
+        response = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        titles = sorted(item['title'] for item in response.data['results'])
+        self.assertEqual(titles, ['Salad', 'Toast'])
+
+    def test_filter_recipes_match_all(self):
+        """Test ?match=all requires every tag and ingredient"""
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Quick')
+        ingredient = sample_ingredient(user=self.user)
+        recipe1 = sample_recipe(user=self.user, title='Salad')
+        recipe1.tags.add(tag1, tag2)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = sample_recipe(user=self.user, title='Toast')
+        recipe2.tags.add(tag1, tag2)
+        recipe3 = sample_recipe(user=self.user, title='Porridge')
+        recipe3.tags.add(tag1)
+        recipe3.ingredients.add(ingredient)
+
+        response = self.client.get(RECIPES_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': str(ingredient.id),
+            'match': 'all',
+        })
+
+        self.assertEqual([item['title'] for item in response.data['results']], ['Salad'])
+
+    def test_filter_recipes_invalid_ids(self):
+        """Test malformed ids are rejected"""
+        response = self.client.get(RECIPES_URL, {'tags': 'not-an-id'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_recipes_sparse_fields(self):
+        """Test ?fields= limits the output and skips relations that were not requested"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(RECIPES_URL, {'fields': 'id,title,price'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'price'})
+
+    def test_list_recipes_summary(self):
+        """Test ?summary=true returns the compact representation"""
+        recipe = sample_recipe(user=self.user)
+
+        response = self.client.get(RECIPES_URL, {'summary': 'true'})
+
+        self.assertEqual(response.data['results'], [{'id': str(recipe.id), 'title': recipe.title}])
+
+    def test_list_recipes_unknown_field(self):
+        """Test unknown field names are rejected"""
+        response = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_view_recipe_detail_expanded(self):
+        """Test ?expand= embeds tags and ingredients in the recipe detail"""
+        recipe = sample_recipe(user=self.user)
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        response = self.client.get(detail_url(recipe.id), {'expand': 'ingredients,tags'})
+
+        self.assertEqual(response.data['tags'], TagSerializer([tag], many=True).data)
+        self.assertEqual(response.data['ingredients'], IngredientSerializer([ingredient], many=True).data)
+
+    def test_list_recipes_expanded_constant_queries(self):
+        """Test expanding relations on a list does not add queries per recipe"""
+        tag = sample_tag(user=self.user)
+        for i in range(10):
+            sample_recipe(user=self.user, title=f'Recipe {i}').tags.add(tag)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        self.assertTrue(all(item['tags'][0]['name'] == tag.name for item in response.data['results']))
+
+    def test_expand_unknown_relation(self):
+        """Test only relations can be expanded"""
+        response = self.client.get(RECIPES_URL, {'expand': 'title'})
 
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
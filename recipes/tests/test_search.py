@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from io import StringIO
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe
+from recipes import search as search_index
+
+
+SEARCH_URL = reverse('recipes:recipes-search')
+
+
+def sample_recipe(user, title, ingredients=()):
+    recipe = Recipe.objects.create(user=user, title=title, time_minutes=10, price=5)
+    for name in ingredients:
+        recipe.ingredients.add(Ingredient.objects.get_or_create(user=user, name=name)[0])
+    return recipe
+
+
+class RecipeSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query):
+        response = self.client.get(SEARCH_URL, {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data]
+
+    def test_search_ranks_title_above_ingredients(self):
+        """Test title matches rank above ingredient matches and prefixes match"""
+        sample_recipe(self.user, 'Pasta with cheese', ['Cheese'])
+        sample_recipe(self.user, 'Chocolate cake', ['Flour', 'Chocolate'])
+        sample_recipe(self.user, 'Mole', ['Chocolate', 'Chili'])
+
+        self.assertEqual(self.search('choc'), ['Chocolate cake', 'Mole'])
+        self.assertEqual(self.search('chocolate chili'), ['Mole'])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes never show up"""
+        user2 = get_user_model().objects.create_user('test2@gmail.com', 'testpassword')
+        sample_recipe(user2, 'Chocolate cake')
+
+        self.assertEqual(self.search('chocolate'), [])
+
+    def test_index_follows_ingredient_changes(self):
+        """Test renaming, unlinking and deleting ingredients updates the index"""
+        recipe = sample_recipe(self.user, 'Cake', ['Cocoa', 'Flour'])
+        cocoa = Ingredient.objects.get(name='Cocoa')
+        cocoa.name = 'Cacao'
+        cocoa.save()
+        self.assertEqual(self.search('cacao'), ['Cake'])
+
+        recipe.ingredients.remove(cocoa)
+        self.assertEqual(self.search('cacao'), [])
+
+        Ingredient.objects.get(name='Flour').delete()
+        self.assertEqual(self.search('flour'), [])
+
+    def test_index_follows_recipe_changes(self):
+        """Test renamed and deleted recipes are reindexed"""
+        recipe = sample_recipe(self.user, 'Soup')
+        recipe.title = 'Stew'
+        recipe.save()
+        self.assertEqual(self.search('stew'), ['Stew'])
+
+        recipe.delete()
+        self.assertEqual(self.search('stew'), [])
+
+    def test_recipes_removed_in_one_statement(self):
+        """Test removing several recipes from the index takes a single query and keeps the others"""
+        removed = [sample_recipe(self.user, f'Soup {number}').pk for number in range(3)]
+        sample_recipe(self.user, 'Soup kept')
+
+        with self.assertNumQueries(1):
+            search_index.remove_recipes(removed)
+
+        self.assertEqual(self.search('soup'), ['Soup kept'])
+
+    def test_bulk_created_recipes_indexed(self):
+        """Test recipes created in a batch are searchable"""
+        payload = [{'title': 'Green curry', 'time_minutes': 10, 'price': '5.00', 'tags': [], 'ingredients': []}]
+        self.client.post(reverse('recipes:recipes-list'), payload, format='json')
+
+        self.assertEqual(self.search('curry'), ['Green curry'])
+
+    def test_search_requires_query(self):
+        response = self.client.get(SEARCH_URL, {'q': '  '})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_picks_fields(self):
+        """Test ?fields= narrows search results and rejects unknown fields like the list does"""
+        recipe = sample_recipe(self.user, 'Leek soup')
+
+        response = self.client.get(SEARCH_URL, {'q': 'soup', 'fields': 'id,title'})
+        self.assertEqual(response.data, [{'id': str(recipe.id), 'title': 'Leek soup'}])
+
+        response = self.client.get(SEARCH_URL, {'q': 'soup', 'fields': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_search_index(self):
+        """Test the rebuild command restores a wiped index"""
+        sample_recipe(self.user, 'Soup', ['Leek'])
+        out = StringIO()
+
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertIn('Indexed 1 recipes', out.getvalue())
+        self.assertEqual(self.search('leek'), ['Soup'])
@@ -0,0 +1,134 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, RecipeStats, TagUsage, IngredientUsage
+from recipes import stats
+
+
+STATS_URL = reverse('recipes:stats')
+RECIPES_URL = reverse('recipes:recipes-list')
+
+
+def sample_recipe(user, title='Recipe', price='5.00', time_minutes=10):
+    return Recipe.objects.create(user=user, title=title, price=price, time_minutes=time_minutes)
+
+
+class RecipeStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.flour = Ingredient.objects.create(user=self.user, name='Flour')
+
+    def assertConsistent(self):
+        self.assertEqual(sum(stats.repair('default', dry_run=True).values()), 0)
+
+    def test_counters_follow_recipe_changes(self):
+        """Test creating, editing and deleting recipes updates the totals"""
+        first = sample_recipe(self.user, price='4.00', time_minutes=10)
+        sample_recipe(self.user, price='8.00', time_minutes=30)
+        first = Recipe.objects.get(pk=first.pk)
+        first.price = Decimal('6.00')
+        first.save()
+
+        summary = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(summary.recipe_count, 2)
+        self.assertEqual(summary.average_price, Decimal('7.00'))
+        self.assertEqual(summary.average_time_minutes, 20)
+
+        first.delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.recipe_count, summary.price_total, summary.time_minutes_total),
+                         (1, Decimal('8.00'), 30))
+        self.assertConsistent()
+
+    def test_usage_follows_link_changes(self):
+        """Test adding, removing and clearing links from either side updates the usage counts"""
+        recipe = sample_recipe(self.user)
+        other = sample_recipe(self.user)
+        recipe.tags.add(self.vegan, self.dessert)
+        self.vegan.recipe_set.add(other)
+        recipe.tags.remove(self.dessert, self.dessert)
+        # Removing a tag that is not linked leaves the counts alone
+        other.tags.remove(self.dessert)
+        self.assertEqual(TagUsage.objects.get(tag=self.vegan).recipe_count, 2)
+        self.assertEqual(TagUsage.objects.get(tag=self.dessert).recipe_count, 0)
+
+        self.vegan.recipe_set.clear()
+        self.assertEqual(TagUsage.objects.get(tag=self.vegan).recipe_count, 0)
+
+        recipe.ingredients.add(self.flour)
+        recipe.delete()
+        self.assertEqual(IngredientUsage.objects.get(ingredient=self.flour).recipe_count, 0)
+        self.assertConsistent()
+
+    def test_bulk_create_counted(self):
+        """Test recipes inserted in a batch are counted without signals"""
+        payload = [
+            {'title': f'Recipe {i}', 'time_minutes': 10, 'price': '2.50',
+             'tags': [self.vegan.id], 'ingredients': [self.flour.id]}
+            for i in range(3)
+        ]
+        response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(RecipeStats.objects.get(user=self.user).recipe_count, 3)
+        self.assertEqual(TagUsage.objects.get(tag=self.vegan).recipe_count, 3)
+        self.assertConsistent()
+
+    def test_stats_endpoint(self):
+        """Test the endpoint returns the averages and the most used tags first"""
+        for price in ('4.00', '6.00'):
+            sample_recipe(self.user, price=price).tags.add(self.vegan)
+        Recipe.objects.filter(user=self.user).first().tags.add(self.dessert)
+        user2 = get_user_model().objects.create_user('test2@gmail.com', 'testpassword')
+        sample_recipe(user2).tags.add(Tag.objects.create(user=user2, name='Other'))
+
+        response = self.client.get(STATS_URL, {'limit': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recipe_count'], 2)
+        self.assertEqual(response.data['average_price'], '5.00')
+        self.assertEqual(response.data['average_time_minutes'], 10)
+        self.assertEqual(response.data['tags'], [{'id': str(self.vegan.id), 'name': 'Vegan', 'recipe_count': 2}])
+        self.assertEqual(response.data['ingredients'], [])
+
+    def test_stats_endpoint_without_recipes(self):
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recipe_count'], 0)
+        self.assertIsNone(response.data['average_price'])
+
+    def test_stats_requires_authentication(self):
+        response = APIClient().get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_repair_command(self):
+        """Test drift from writes that bypass the signals is reported by --check and then fixed"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan)
+        Recipe.objects.filter(pk=recipe.pk).update(price='9.00')
+        Recipe.tags.through.objects.bulk_create([Recipe.tags.through(recipe_id=recipe.pk, tag_id=self.dessert.pk)])
+
+        with self.assertRaises(CommandError):
+            call_command('repair_recipe_stats', check=True, stdout=StringIO())
+
+        out = StringIO()
+        call_command('repair_recipe_stats', user=self.user.email, stdout=out)
+        self.assertIn('2 rows repaired', out.getvalue())
+        self.assertEqual(RecipeStats.objects.get(user=self.user).price_total, Decimal('9.00'))
+        self.assertEqual(TagUsage.objects.get(tag=self.dessert).recipe_count, 1)
+        self.assertConsistent()
@@ -34,10 +34,10 @@ class PrivateTagsAPITests(TestCase):
         Tag.objects.create(user=self.user, name='Meat')
 
         response = self.client.get(TAGS_URL)
-        tags = Tag.objects.all()
+        tags = Tag.objects.order_by('id')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test the tags returned belongs to the authenticated user"""
@@ -47,8 +47,8 @@ class PrivateTagsAPITests(TestCase):
         response = self.client.get(TAGS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], tag.name)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test tag creation when sending correct parameters in POST method"""
@@ -63,4 +63,24 @@ class PrivateTagsAPITests(TestCase):
         payload = {'name': ''}
         response = self.client.post(TAGS_URL, payload)
 
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_paginated_with_cursor(self):
+        """Test tags are paged through with opaque cursors without repeating rows"""
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        response = self.client.get(TAGS_URL, {'page_size': 2})
+        first_page = response.data['results']
+        self.assertEqual(len(first_page), 2)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        second_page = response.data['results']
+        self.assertEqual(len(second_page), 2)
+        self.assertIsNotNone(response.data['previous'])
+
+        seen = {tag['id'] for tag in first_page + second_page}
+        self.assertEqual(len(seen), 4)
+        self.assertEqual([tag['id'] for tag in second_page], sorted(tag['id'] for tag in second_page))
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 
 router = DefaultRouter()
@@ -11,5 +11,9 @@ router.register('recipes', views.RecipeViewSet, basename='recipes')
 
 app_name = 'recipes'
 urlpatterns = [
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
+    path('cache-metrics/', views.CacheMetricsView.as_view(), name='cache-metrics'),
+    path('async/recipes/', async_views.AsyncRecipeListView.as_view(), name='async-recipe-list'),
+    path('async/recipes/<uuid:pk>/', async_views.AsyncRecipeDetailView.as_view(), name='async-recipe-detail'),
     path('', include(router.urls)),
 ]
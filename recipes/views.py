@@ -1,44 +1,207 @@
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient, Recipe
+from core import sharding
+from core.models import Tag, Ingredient, Recipe, RecipeStats, TagUsage, IngredientUsage
+from recipes import search as search_index
 from recipes import serializers
+from recipes.caching import CachedListMixin, cache_metrics
+from recipes.conditional import ConditionalGetMixin
+from recipes.export import EXPORT_FORMATS
+from recipes.filters import RecipeRelationsFilter
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrsViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.ListModelMixin):
-    authentication_classes = (TokenAuthentication,)
-    permission_classes = (IsAuthenticated,)
+class UserShardMixin:
+    """Route the recipe data queries of the request to the authenticated user's shard"""
 
-    def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._shard_token = sharding.activate(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = self.__dict__.pop('_shard_token', None)
+        if token is not None:
+            sharding.deactivate(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class BulkCreateModelMixin(mixins.CreateModelMixin):
+    """Create one object, or a whole batch in one transaction when the payload is a list"""
+    bulk_create_max = 10000
+
+    def get_serializer(self, *args, **kwargs):
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list) and len(request.data) > self.bulk_create_max:
+            msg = _('Batches are limited to %(max)d objects') % {'max': self.bulk_create_max}
+            raise ValidationError(msg)
+
+        with transaction.atomic(using=router.db_for_write(self.queryset.model)):
+            return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+class BaseRecipeAttrsViewSet(UserShardMixin, BulkCreateModelMixin, CachedListMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.ListModelMixin):
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+
 class TagViewSet(BaseRecipeAttrsViewSet):
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    cache_resource = 'tags'
 
     
 class IngredientViewSet(BaseRecipeAttrsViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    cache_resource = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(UserShardMixin, BulkCreateModelMixin, CachedListMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    cache_resource = 'recipes'
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    filter_backends = (RecipeRelationsFilter,)
+    export_chunk_size = 500
+    related_fields = ('ingredients', 'tags')
+    summary_fields = ('id', 'title')
+    read_actions = ('list', 'retrieve', 'search')
+    search_max_results = 100
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        """Return user recipes, loading only the requested columns and relations"""
+        queryset = self.queryset.filter(user=self.request.user)
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset.prefetch_related(*self.related_fields)
+
+        related = [name for name in self.related_fields if name in fields]
+        concrete = [name for name in fields if name not in related]
+        return queryset.only('id', *concrete).prefetch_related(*related)
+
+    def get_requested_fields(self):
+        """Fields picked with ?fields= or ?summary=true on reads, None meaning every field"""
+        if hasattr(self, '_requested_fields'):
+            return self._requested_fields
+
+        params = self.request.query_params
+        fields = None
+        if self.action in self.read_actions:
+            if params.get('summary', '').lower() in ('1', 'true'):
+                fields = list(self.summary_fields)
+            elif params.get('fields'):
+                fields = list(dict.fromkeys(name.strip() for name in params['fields'].split(',') if name.strip()))
+                unknown = [name for name in fields if name not in self.get_serializer_class()().fields]
+                if unknown:
+                    raise ValidationError({'fields': _('Unknown fields: %s') % ', '.join(unknown)})
+
+        self._requested_fields = fields
+        return fields
+
+    def get_requested_expansions(self):
+        """Relations to embed in full with ?expand=ingredients,tags on reads"""
+        value = self.request.query_params.get('expand', '')
+        if self.action not in self.read_actions or not value:
+            return ()
+
+        expand = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in expand if name not in self.related_fields]
+        if unknown:
+            raise ValidationError({'expand': _('Cannot expand: %s') % ', '.join(unknown)})
+        return expand
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        context['expand'] = self.get_requested_expansions()
+        return context
 
     def get_serializer_class(self):
         """Return appropiate serializer class according to request action"""
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
 
-        return self.serializer_class
\ No newline at end of file
+        return self.serializer_class
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, super().retrieve, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the whole recipe book as a JSON array, or as NDJSON with ?type=ndjson"""
+        export_type = request.query_params.get('type', 'json')
+        if export_type not in EXPORT_FORMATS:
+            raise ValidationError({'type': _('Choose one of: %s') % ', '.join(EXPORT_FORMATS)})
+
+        stream, content_type, filename = EXPORT_FORMATS[export_type]
+        # The stream is consumed after the request's shard is deactivated, so pin the database now
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(stream(queryset, self.export_chunk_size), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Recipes whose title or ingredients match every word of ?q=, best match first"""
+        query = request.query_params.get('q', '')
+        if not search_index.terms(query):
+            raise ValidationError({'q': _('Enter at least one word to search for')})
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.search_max_results)
+        except ValueError:
+            raise ValidationError({'limit': _('A valid integer is required.')})
+
+        ids = search_index.search(request.user, query, limit=max(limit, 1))
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([recipes[pk] for pk in ids if pk in recipes], many=True)
+        return Response(serializer.data)
+
+
+class RecipeStatsView(UserShardMixin, APIView):
+    """The user's recipe count and averages, and their tags and ingredients by number of recipes"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': _('A valid integer is required.')})
+
+        summary = RecipeStats.objects.filter(user=request.user).first() or RecipeStats(user=request.user)
+        summary.tags, summary.ingredients = (
+            usage.objects.filter(user=request.user, recipe_count__gt=0).select_related(field)
+            .order_by('-recipe_count', f'{field}__name')[:max(limit, 0)]
+            for usage, field in ((TagUsage, 'tag'), (IngredientUsage, 'ingredient'))
+        )
+        return Response(serializers.RecipeStatsSerializer(summary).data)
+
+
+class CacheMetricsView(APIView):
+    """Hit and miss counters of the list response cache"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(cache_metrics())
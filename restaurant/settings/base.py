@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
+# manage.py test, for defaults that differ in the test run
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.0/howto/deployment/checklist/
@@ -47,6 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.sqlite.SQLiteWriteQueueMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +66,20 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fraction of requests profiled by core.middleware.ProfilingMiddleware, none in the test run
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0' if TESTING else '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'restaurant.urls'
 
 TEMPLATES = [
@@ -87,6 +111,81 @@ DATABASES = {
     }
 }
 
+# Read replicas. SQLITE_REPLICAS=replica.sqlite3,... adds local copies of db.sqlite3 for
+# trying the routing out; keeping them in sync (e.g. by copying the file) is up to you.
+for number, name in enumerate(filter(None, os.environ.get('SQLITE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / name,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+
+# Per-user shards of the recipe data, see core.sharding. Users are routed to the aliases listed
+# in DATABASE_SHARDS, e.g. DATABASE_SHARDS=shard1,shard2, which are declared as SQLite files here.
+# SQLITE_SHARD_COUNT=N declares shard1..shardN ahead of that, so a new shard can be migrated
+# before it is listed; run rebalance_shards after changing the list. The test run declares two
+# in-memory shards for the sharding tests, which turn the routing on with override_settings.
+DATABASE_SHARDS = [alias for alias in os.environ.get('DATABASE_SHARDS', '').split(',') if alias]
+
+SQLITE_SHARD_COUNT = int(os.environ.get('SQLITE_SHARD_COUNT', '2' if TESTING else '0'))
+
+for alias in [f'shard{number}' for number in range(1, SQLITE_SHARD_COUNT + 1)] + DATABASE_SHARDS:
+    DATABASES.setdefault(alias, {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+    })
+
+DATABASE_ROUTERS = ['core.routers.ShardRouter', 'core.routers.PrimaryReplicaRouter']
+
+# Seconds a client's reads stay on the primary after it wrote, so it sees its own changes
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+
+REPLICA_STICKY_CACHE_ALIAS = 'default'
+
+# Opt-in SQLite profile for concurrent load, see core.sqlite
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '').lower() in ('1', 'true', 'yes')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # KiB, so 64 MiB
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,  # ms
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Token lookups and list responses default to per-process LRU caches. Point
+# 'tokens' and 'responses' at django.core.cache.backends.redis.RedisCache when
+# running several processes so invalidations are seen by all of them immediately;
+# production settings do so from REDIS_URL.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+TOKEN_CACHE_ALIAS = 'tokens'
+
+RECIPES_CACHE_ALIAS = 'responses'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -106,6 +205,45 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = ['user.backends.PooledModelBackend']
+
+# The first hasher of the active profile hashes new passwords; the others only verify
+# existing hashes, which are rehashed with the preferred one on the next successful login.
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': [
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'user.hashers.TunedScryptPasswordHasher',
+        'user.hashers.TunedArgon2PasswordHasher',
+    ],
+    'scrypt': [
+        'user.hashers.TunedScryptPasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'user.hashers.TunedArgon2PasswordHasher',
+    ],
+    'argon2': [
+        'user.hashers.TunedArgon2PasswordHasher',
+        'user.hashers.TunedScryptPasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    ],
+}
+
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+
+if PASSWORD_HASHER_PROFILE not in PASSWORD_HASHER_PROFILES:
+    raise ImproperlyConfigured(
+        f'Unknown PASSWORD_HASHER_PROFILE {PASSWORD_HASHER_PROFILE!r}, use {", ".join(PASSWORD_HASHER_PROFILES)}'
+    )
+
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+
+# Password hashing and verification run on a dedicated thread pool. Requests beyond
+# WORKERS + QUEUE_DEPTH concurrent operations are rejected with 429 and Retry-After.
+PASSWORD_HASHING_POOL = {
+    'WORKERS': 4,
+    'QUEUE_DEPTH': 16,
+    'RETRY_AFTER': 1,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
@@ -130,4 +268,13 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'core.User'
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipes.pagination.RecipeAttrsCursorPagination',
+    'PAGE_SIZE': 100,
+}
\ No newline at end of file
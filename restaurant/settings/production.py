@@ -0,0 +1,97 @@
+"""Production settings: PostgreSQL, Redis and secrets come from the environment
+
+DATABASE_POOLER chooses how connections are pooled:
+  (unset)    persistent connections, one per worker thread, kept for DB_CONN_MAX_AGE seconds
+  pgbouncer  DB_HOST/DB_PORT point at PgBouncer in transaction mode, which owns the server
+             connections; server side cursors are disabled since they do not survive it
+  psycopg    psycopg 3 connection pool inside each process, needs Django 5.1 or newer
+"""
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *
+
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+DATABASE_POOLER = os.environ.get('DATABASE_POOLER', '')
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'restaurant'),
+        'USER': os.environ.get('DB_USER', 'restaurant'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Reuse connections across requests and check them before use after an idle period
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+            'sslmode': os.environ.get('DB_SSLMODE', 'prefer'),
+        },
+    }
+}
+
+# Streaming replicas of the primary, DB_REPLICA_HOSTS=host1,host2 with the same credentials
+for number, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+
+# Shards for the recipe data, DB_SHARD_HOSTS=host1,host2 with the same credentials and
+# database name; see core.sharding and the rebalance_shards command
+for number, host in enumerate(filter(None, os.environ.get('DB_SHARD_HOSTS', '').split(',')), start=1):
+    DATABASES[f'shard{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+    }
+
+DATABASE_SHARDS = [alias for alias in DATABASES if alias.startswith('shard')]
+
+if DATABASE_POOLER == 'pgbouncer':
+    for database in DATABASES.values():
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DATABASE_POOLER == 'psycopg':
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured('DATABASE_POOLER=psycopg needs Django 5.1 or newer')
+    # The pool keeps the connections, Django must close (return) them after each request
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        }
+elif DATABASE_POOLER:
+    raise ImproperlyConfigured(f'Unknown DATABASE_POOLER {DATABASE_POOLER!r}, use pgbouncer or psycopg')
+
+# Every process must see the same token and response caches, the replica stickiness marks and
+# the Last-Modified times, or invalidations made by one process would go unnoticed by the others
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if not REDIS_URL:
+    raise ImproperlyConfigured('REDIS_URL must point at the cache shared by all the processes')
+
+CACHES = {
+    alias: {
+        **cache,
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        # The LRU limits of the per-process caches are left to the Redis maxmemory policy
+        'OPTIONS': {},
+        'KEY_PREFIX': alias,
+    }
+    for alias, cache in CACHES.items()
+}
@@ -0,0 +1,82 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+def token_cache_key(key):
+    """Cache key for a token, hashed so raw tokens never reach the cache backend"""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_cache():
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def invalidate_tokens(keys):
+    """Drop cached token lookups so the next request hits the database again"""
+    token_cache().delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user resolution
+
+    The user is loaded with its password deferred, so password hashes never reach the cache.
+    Code that needs the hash loads it on access, and saving the user leaves it untouched.
+    """
+
+    def get_tokens(self):
+        return self.get_model().objects.select_related('user').defer('user__password')
+
+    def authenticate_credentials(self, key):
+        cache = token_cache()
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+
+        if cached is None:
+            try:
+                token = self.get_tokens().get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cached = (token.user, token)
+            cache.set(cache_key, cached)
+
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return user, token
+
+    async def aauthenticate(self, request):
+        """Async counterpart of authenticate() for views running on the event loop"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        cache = token_cache()
+        cache_key = token_cache_key(key)
+        cached = await cache.aget(cache_key)
+
+        if cached is None:
+            try:
+                token = await self.get_tokens().aget(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cached = (token.user, token)
+            await cache.aset(cache_key, cached)
+
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return user, token
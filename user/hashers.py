@@ -0,0 +1,21 @@
+"""Password hashers tuned for the login tier, selected through PASSWORD_HASHER_PROFILE
+
+Each class keeps the algorithm name of the Django hasher it extends, so hashes stored with
+other parameters are still verified and then upgraded by must_update() on the next login.
+"""
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt with N=2**15, r=8, p=1: 32 MiB per hash, so memory bounds how many run at once"""
+    work_factor = 2 ** 15
+    block_size = 8
+    parallelism = 1
+    maxmem = 64 * 1024 * 1024
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """argon2id with t=2, m=19 MiB, p=1, trading Django's 100 MiB and 8 lanes for throughput per core"""
+    time_cost = 2
+    memory_cost = 19 * 1024
+    parallelism = 1
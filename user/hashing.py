@@ -0,0 +1,126 @@
+"""Bounded worker pool for password hashing and verification
+
+PBKDF2 and the other hashers release the GIL while they run, so worker threads hash in
+parallel while the pool size caps how many cores login and signup traffic may take from the
+other endpoints. Work beyond the queue depth is refused right away with a 429.
+"""
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+
+from core import profiling
+
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashingBusy(exceptions.Throttled):
+    default_detail = _('Too many password operations in progress, try again shortly.')
+
+
+class HashingPool:
+
+    def __init__(self, workers, queue_depth, retry_after, samples=1000):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self.slots = threading.BoundedSemaphore(workers + queue_depth)
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.wait_ms = collections.deque(maxlen=samples)
+        self.hash_ms = collections.deque(maxlen=samples)
+
+    def run(self, operation, func, *args):
+        """Run func on a worker, waiting for its result, or raise PasswordHashingBusy when full"""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.counts['rejected'] += 1
+            raise PasswordHashingBusy(wait=self.retry_after)
+
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = self.executor.submit(self.timed, func, *args).result()
+        finally:
+            self.slots.release()
+
+        wait_ms = (started - submitted) * 1000
+        hash_ms = (finished - started) * 1000
+        with self.lock:
+            self.counts[operation] += 1
+            self.wait_ms.append(wait_ms)
+            self.hash_ms.append(hash_ms)
+        profiling.record('hashing', wait_ms + hash_ms)
+        logger.debug('password %s took %.1fms after %.1fms queued', operation, hash_ms, wait_ms)
+        return result
+
+    @staticmethod
+    def timed(func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        return result, started, time.perf_counter()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'hashed': self.counts['hash'],
+                'verified': self.counts['verify'],
+                'rejected': self.counts['rejected'],
+                'wait': profiling.summarize(list(self.wait_ms)),
+                'hash': profiling.summarize(list(self.hash_ms)),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            options = settings.PASSWORD_HASHING_POOL
+            _pool = HashingPool(options['WORKERS'], options['QUEUE_DEPTH'], options['RETRY_AFTER'])
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    global _pool
+    if setting == 'PASSWORD_HASHING_POOL':
+        with _pool_lock:
+            if _pool is not None:
+                _pool.executor.shutdown(wait=False)
+            _pool = None
+
+
+def make_password(raw_password):
+    return get_pool().run('hash', hashers.make_password, raw_password)
+
+
+def set_password(user, raw_password):
+    """Pooled equivalent of user.set_password()"""
+    user.password = make_password(raw_password)
+    user._password = raw_password
+
+
+def verify_password(user, raw_password):
+    """Pooled equivalent of user.check_password(), upgrading outdated hashes in place"""
+    outdated = []
+    valid = get_pool().run('verify', hashers.check_password, raw_password, user.password, outdated.append)
+    if valid and outdated:
+        set_password(user, raw_password)
+        user._password = None
+        user.save(update_fields=['password'])
+    return valid
+
+
+def hashing_metrics():
+    return get_pool().metrics()
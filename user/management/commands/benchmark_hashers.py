@@ -0,0 +1,47 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from core import bench, profiling
+
+
+class Command(BaseCommand):
+    help = 'Measure hashes per second per core of the preferred hasher of each password hasher profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            help='Profile from PASSWORD_HASHER_PROFILES, may be repeated (default: all)')
+        parser.add_argument('--iterations', type=int, default=50, help='Hashes per thread')
+        parser.add_argument('--threads', type=int, default=os.cpu_count(),
+                            help='Threads for the saturated run, one per core by default')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        for profile in options['profiles'] or settings.PASSWORD_HASHER_PROFILES:
+            path = settings.PASSWORD_HASHER_PROFILES[profile][0]
+            hasher = import_string(path)()
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {profile} ({path}) =='))
+            try:
+                encoded = hasher.encode('benchmark-password', hasher.salt())
+            except ValueError as exc:
+                # Argon2 needs the optional argon2-cffi package
+                self.stdout.write(self.style.WARNING(f'skipped: {exc}'))
+                continue
+
+            stats = profiling.summarize(bench.measure(lambda: hasher.encode('benchmark-password', hasher.salt()),
+                                                  options['iterations']))
+            verify = profiling.summarize(bench.measure(lambda: hasher.verify('benchmark-password', encoded),
+                                                   options['iterations']))
+            samples, elapsed = bench.measure_threaded(
+                lambda: hasher.encode('benchmark-password', hasher.salt()), options['iterations'] * threads, threads,
+            )
+            self.stdout.write(
+                f'hash: {1000 / stats["mean_ms"]:.1f}/s on one core, p50={stats["p50_ms"]:.1f}ms '
+                f'p95={stats["p95_ms"]:.1f}ms; verify p50={verify["p50_ms"]:.1f}ms'
+            )
+            self.stdout.write(
+                f'{threads} threads: {len(samples) / elapsed:.1f} hashes/s, '
+                f'{len(samples) / elapsed / threads:.1f}/s per core'
+            )
@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from . import hashing
+
 
 class UserSerializer(serializers.ModelSerializer):
 
@@ -11,14 +13,21 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
 
     def create(self, validated_data):
-        return get_user_model().objects.create_user(**validated_data)
+        """Create the user like create_user(), hashing the password on the hashing pool"""
+        UserModel = get_user_model()
+        password = validated_data.pop('password')
+        user = UserModel(**validated_data)
+        user.email = UserModel.objects.normalize_email(user.email)
+        hashing.set_password(user, password)
+        user.save()
+        return user
 
     def update(self, instance, validated_data):
         password = validated_data.pop('password', None)
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            hashing.set_password(user, password)
             user.save()
         
         return user
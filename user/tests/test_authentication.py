@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, token_cache, token_cache_key
+
+
+ME_URL = reverse('user:me')
+ASYNC_CREATE_URL = reverse('user:async_create_user')
+ASYNC_ME_URL = reverse('user:async_me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache().clear()
+        self.user = get_user_model().objects.create_user(email='test@gmail.com', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_lookup_cached_after_first_request(self):
+        """Test the token is resolved from the cache once it has been seen"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+
+    def test_password_hash_not_cached(self):
+        """Test the cached user leaves its password out and saving it keeps the stored hash"""
+        self.auth.authenticate_credentials(self.token.key)
+        user, token = token_cache().get(token_cache_key(self.token.key))
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.patch(ME_URL, {'name': 'Renamed'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Renamed')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token stops authenticating immediately"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user rejects its cached token"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_token_header_authenticates_request(self):
+        """Test the endpoints accept the cached token authentication"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+
+class AsyncUserViewTests(TestCase):
+
+    def setUp(self):
+        token_cache().clear()
+        self.client = AsyncClient()
+
+    async def test_async_create_then_me(self):
+        """Test a user created through the async view can read its profile with a token"""
+        payload = {'email': 'test@gmail.com', 'password': 'testpass123', 'name': 'Tester'}
+        response = await self.client.post(ASYNC_CREATE_URL, payload, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('password', response.json())
+
+        user = await get_user_model().objects.aget(email='test@gmail.com')
+        token = await Token.objects.acreate(user=user)
+        response = await self.client.get(ASYNC_ME_URL, headers={'authorization': f'Token {token.key}'})
+
+        self.assertEqual(response.json(), {'email': 'test@gmail.com', 'name': 'Tester'})
+
+    async def test_async_me_rejects_invalid_token(self):
+        """Test an unknown token is rejected"""
+        response = await self.client.get(ASYNC_ME_URL, headers={'authorization': 'Token nope'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
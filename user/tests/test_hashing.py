@@ -0,0 +1,94 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashing
+
+
+TOKEN_URL = reverse('user:token')
+METRICS_URL = reverse('user:hashing_metrics')
+
+SINGLE_SLOT_POOL = {'WORKERS': 1, 'QUEUE_DEPTH': 0, 'RETRY_AFTER': 3}
+
+
+class HashingPoolTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpass123')
+        self.client = APIClient()
+
+    @override_settings(PASSWORD_HASHING_POOL=SINGLE_SLOT_POOL)
+    def test_saturated_pool_rejects_with_429(self):
+        """Test logins are refused with Retry-After while every slot is taken"""
+        running, release = threading.Event(), threading.Event()
+
+        def hold():
+            running.set()
+            release.wait()
+
+        busy = threading.Thread(target=hashing.get_pool().run, args=('hash', hold))
+        busy.start()
+        running.wait()
+        try:
+            response = self.client.post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'testpass123'})
+        finally:
+            release.set()
+            busy.join()
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(hashing.hashing_metrics()['rejected'], 1)
+
+        response = self.client.post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_outdated_hash_upgraded_on_login(self):
+        """Test a password stored with fewer iterations is rehashed after a successful login"""
+        self.user.password = PBKDF2PasswordHasher().encode('testpass123', 'salt', iterations=1000)
+        self.user.save()
+
+        response = self.client.post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'testpass123'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertNotIn('$1000$', self.user.password)
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_profile_switch_rehashes_on_login(self):
+        """Test PBKDF2 hashes move to the preferred hasher of a newly selected profile"""
+        with override_settings(PASSWORD_HASHERS=settings.PASSWORD_HASHER_PROFILES['scrypt']):
+            response = self.client.post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'testpass123'})
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$32768$'))
+
+        response = self.client.post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_wrong_password_and_unknown_email_rejected(self):
+        """Test both failures go through the pool and are rejected"""
+        verified = hashing.hashing_metrics()['verified']
+        for email, password in (('test@gmail.com', 'wrong'), ('nobody@gmail.com', 'testpass123')):
+            response = self.client.post(TOKEN_URL, {'email': email, 'password': password})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(hashing.hashing_metrics()['verified'], verified + 1)
+
+    def test_metrics_admin_only(self):
+        """Test only staff can read the pool metrics"""
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = get_user_model().objects.create_superuser('admin@gmail.com', 'testpass123')
+        self.client.force_authenticate(admin)
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('p95_ms', response.data['hash'])
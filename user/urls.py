@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 
 app_name = 'user'
@@ -8,5 +8,8 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create_user'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
-    path('me/', views.ManageUSerView.as_view(), name='me')
+    path('me/', views.ManageUSerView.as_view(), name='me'),
+    path('hashing-metrics/', views.HashingMetricsView.as_view(), name='hashing_metrics'),
+    path('async/create/', async_views.AsyncCreateUserView.as_view(), name='async_create_user'),
+    path('async/me/', async_views.AsyncManageUserView.as_view(), name='async_me'),
 ]